@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Замеры скорости горячих мест движка на одних и тех же (засеянных) данных.
+#   python benchmark.py                          - замерить и напечатать JSON;
+#   python benchmark.py -o bench.json            - сохранить результат (например, как базовый);
+#   python benchmark.py --compare bench.json     - сравнить с базовым, код выхода 1 при ухудшении.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from random import Random
+
+import card_game_fool as fool
+import fool_engine
+import fool_variant
+
+SCENARIOS = {}  # Название -> функция(n) -> число выполненных операций.
+
+
+def scenario(name):
+    def register(function):
+        SCENARIOS[name] = function
+        return function
+    return register
+
+
+@scenario('deck')  # Создание и тасовка колоды, раздача всех карт.
+def bench_deck(n):
+    for seed in range(n):
+        deck = fool.Deck(Random(seed))
+        while deck.len():
+            deck.get_cards()
+    return n
+
+
+@scenario('check_cover')  # Table.check и Card.cover на случайных парах карт.
+def bench_check_cover(n):
+    rng = Random(1)
+    cards = list(fool.Card.sequence())
+    pairs = [(rng.choice(cards), rng.choice(cards), fool.Suit(rng.randrange(4))) for _ in range(1000)]
+    tables = []
+    for attack, _, trump in pairs:
+        table = fool.Table(fool.Card(fool.Dignity(0), trump))
+        table.go(attack)
+        tables.append(table)
+    count = 0
+    for _ in range(max(1, n // 1000)):
+        for (attack, defence, trump), table in zip(pairs, tables):
+            defence.cover(attack, trump)
+            table.check(defence)
+            count += 1
+    return count
+
+
+def positions(count):  # Засеянные позиции середины партии для хода Болвана.
+    games = []
+    for seed in range(count):
+        game = fool.Game(Random(seed))
+        rng = Random(seed)
+        for _ in range(rng.randrange(1, 12)):
+            legal = game.table.legal_moves(game.hand_gamer.mask)
+            if not legal:
+                break
+            string = game.command(str(fool.Card.by_id(fool.lowest_card(legal))))
+            if string.find('GameOver:') != -1:
+                break
+        games.append(game)
+    return games
+
+
+@scenario('dummy')  # Выбор хода Болваном.
+def bench_dummy(n):
+    games = positions(100)
+    policy = fool.Dummy()
+    for _ in range(max(1, n // len(games))):
+        for game in games:
+            policy.choose(game)
+    return max(1, n // len(games)) * len(games)
+
+
+@scenario('command')  # Полные партии через Game.command: игрок ходит как Болван.
+def bench_command(n):
+    commands = 0
+    for seed in range(n):
+        game = fool.Game(Random(seed))
+        while True:
+            legal = game.table.legal_moves(game.hand_gamer.mask)
+            moves = legal & ~fool.SUIT_MASKS[game.table.trump_suit().value()] or legal
+            if moves:
+                string = game.command(str(fool.Card.by_id(fool.lowest_card(moves))))
+            else:
+                string = game.command('Пас' if game.table.is_attack() else 'Взял')
+            game.command('Инфо')
+            commands += 2
+            if string.find('GameOver:') != -1:
+                break
+    return commands
+
+
+@scenario('events')  # То же, что command, но ходы через Game.play: события без текста, Инфо не запрашивается.
+def bench_events(n):
+    count = 0
+    for seed in range(n):
+        game = fool.Game(Random(seed))
+        while True:
+            legal = game.table.legal_moves(game.hand_gamer.mask)
+            moves = legal & ~fool.SUIT_MASKS[game.table.trump_suit().value()] or legal
+            events = game.play(fool.CARDS[fool.lowest_card(moves)] if moves else None)
+            count += 1
+            if type(events[-1]) is fool.GameOver:
+                break
+    return count
+
+
+@scenario('simulate')  # Партии в секунду: Болван против Болвана в fool_engine.
+def bench_simulate(n):
+    fool_engine.simulate(n)
+    return n
+
+
+@scenario('variant')  # То же, что simulate, но через скомпилированные правила fool_variant (Rules()).
+def bench_variant(n):
+    fool_variant.simulate(n)
+    return n
+
+
+@scenario('startup')  # Запуск main.py в пакетном режиме до ответа на первую команду и выхода.
+def bench_startup(n):
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    for _ in range(n):
+        subprocess.run([sys.executable, main, '--batch', '--seed', '0'], input='Рука\nВыход\n'.encode('utf-8'),
+                       stdout=subprocess.DEVNULL, check=True)
+    return n
+
+
+SIZES = {'deck': 20000, 'check_cover': 200000, 'dummy': 50000, 'command': 300, 'events': 300, 'simulate': 3000,
+         'variant': 3000, 'startup': 20}
+
+
+def run(names=None, repeat=3, scale=1.0):  # Лучшее из repeat замеров каждого сценария.
+    results = {}
+    for name in names or SCENARIOS:
+        size = max(1, int(SIZES[name] * scale))
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            operations = SCENARIOS[name](size)
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best[0]:
+                best = seconds, operations
+        results[name] = {'seconds': best[0], 'operations': best[1], 'ops_per_sec': best[1] / best[0],
+                         'ms_per_op': best[0] * 1000 / best[1]}
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+
+
+def compare(current, baseline, threshold=0.1):  # Сценарии, где скорость упала больше чем на threshold.
+    regressions = {}
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['ops_per_sec'] / base['ops_per_sec']
+        if ratio < 1 - threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры скорости движка "Подкидной Дурак".')
+    parser.add_argument('scenarios', nargs='*', help='сценарии: {} (по умолчанию все)'.format(', '.join(SCENARIOS)))
+    parser.add_argument('-o', '--output', help='сохранить результат в JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='сравнить с сохранённым результатом')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое замедление (0.1 = 10%%)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='множитель размера сценариев')
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error('неизвестный сценарий: ' + name)
+
+    current = run(args.scenarios, args.repeat, args.scale)
+    text = json.dumps(current, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold)
+        for name, ratio in sorted(regressions.items()):
+            print('РЕГРЕССИЯ {}: {:.1%} от базовой скорости'.format(name, ratio), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
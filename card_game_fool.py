@@ -1,39 +1,53 @@
 # -*- coding: utf-8 -*-
-from random import shuffle
+import random
+from collections import namedtuple
+from functools import lru_cache
+from time import perf_counter
 
 
 ####################
-class Suit:  # Масть
+class Suit:  # Масть. Все масти - заранее созданные единственные экземпляры.
 
     __names = 'пики', 'трефы', 'бубны', 'червы'
+    __width = max(len(name) for name in __names)  # Длина самого длинного названия масти.
+    __suits = []  # Все масти по номеру.
+    __by_name = {}  # Масти по названию.
+    __slots__ = '__value', '__name', '__just'
 
-    def __init__(self, n):
+    def __new__(cls, n):
         assert isinstance(n, int)
         assert 0 <= n < Suit.len()
-        self.__value = n
+        return Suit.__suits[n]
+
+    @staticmethod
+    def _intern():  # Создание всех мастей. Вызывается один раз при импорте модуля.
+        for n, name in enumerate(Suit.__names):
+            suit = object.__new__(Suit)
+            suit.__value = n
+            suit.__name = name
+            suit.__just = name.ljust(Suit.__width)
+            Suit.__suits.append(suit)
+            Suit.__by_name[name] = suit
+
+    def __reduce__(self):  # Для pickle: восстанавливать тот же единственный экземпляр.
+        return Suit, (self.__value,)
 
     def value(self):
         return self.__value
 
     def __str__(self):
-        return str(Suit.__names[self.__value])
+        return self.__name
 
     def __repr__(self):
-        return str(Suit.__names[self.__value])
+        return self.__name
 
     def just(self):  # Пробелы справа до максимально длинного названия масти
-        return str(Suit.__names[self.__value]).ljust(max(len(name) for name in Suit.__names))
+        return self.__just
 
     def __hash__(self):
         return self.__value
 
-    def __eq__(self, other):  # x == y
-        assert isinstance(other, Suit)
-        return self.__value == other.value()
-
-    def __ne__(self, other):  # x != y
-        assert isinstance(other, Suit)
-        return self.__value != other.value()
+    # Масти единственны, поэтому равенство - это тождество (__eq__ от object).
 
     @staticmethod
     def len():
@@ -41,62 +55,72 @@ class Suit:  # Масть
 
     @staticmethod
     def sequence():
-        return (Suit(n) for n in range(Suit.len()))
+        return iter(Suit.__suits)
 
     @staticmethod
     def name(string):
         assert isinstance(string, str)
-        return Suit(Suit.__names.index(string)) if string in Suit.__names else None
+        return Suit.__by_name.get(string)
+
+
+Suit._intern()
 
 
 ######################################
-class Dignity:  # Номинал, достоинство
+class Dignity:  # Номинал, достоинство. Все достоинства - заранее созданные единственные экземпляры.
 
     __names = '6', '7', '8', '9', '10', 'Валет', 'Дама', 'Король', 'Туз'
+    __width = max(len(name) for name in __names)  # Длина самого длинного названия.
+    __dignities = []  # Все достоинства по номеру.
+    __by_name = {}  # Достоинства по названию.
+    __slots__ = '__value', '__name', '__just'
 
-    def __init__(self, n):
+    def __new__(cls, n):
         assert isinstance(n, int)
         assert 0 <= n < Dignity.len()
-        self.__value = n
+        return Dignity.__dignities[n]
+
+    @staticmethod
+    def _intern():  # Создание всех достоинств. Вызывается один раз при импорте модуля.
+        for n, name in enumerate(Dignity.__names):
+            dignity = object.__new__(Dignity)
+            dignity.__value = n
+            dignity.__name = name
+            dignity.__just = name.rjust(Dignity.__width)
+            Dignity.__dignities.append(dignity)
+            Dignity.__by_name[name] = dignity
+
+    def __reduce__(self):  # Для pickle: восстанавливать тот же единственный экземпляр.
+        return Dignity, (self.__value,)
 
     def value(self):
         return self.__value
 
     def __str__(self):
-        return str(Dignity.__names[self.__value])
+        return self.__name
 
     def __repr__(self):
-        return str(Dignity.__names[self.__value])
+        return self.__name
 
     def just(self):  # Пробелы слева до максимально длинного названия
-        return str(Dignity.__names[self.__value]).rjust(max(len(name) for name in Dignity.__names))
+        return self.__just
 
     def __hash__(self):
         return self.__value
 
     def __lt__(self, other):  # x < y
-        assert isinstance(other, Dignity)
-        return self.__value < other.value()
+        return self.__value < other.__value
 
     def __le__(self, other):  # x ≤ y
-        assert isinstance(other, Dignity)
-        return self.__value <= other.value()
-
-    def __eq__(self, other):  # x == y
-        assert isinstance(other, Dignity)
-        return self.__value == other.value()
+        return self.__value <= other.__value
 
-    def __ne__(self, other):  # x != y
-        assert isinstance(other, Dignity)
-        return self.__value != other.value()
+    # Достоинства единственны, поэтому равенство - это тождество (__eq__ от object).
 
     def __gt__(self, other):  # x > y
-        assert isinstance(other, Dignity)
-        return self.__value > other.value()
+        return self.__value > other.__value
 
     def __ge__(self, other):  # x ≥ y
-        assert isinstance(other, Dignity)
-        return self.__value >= other.value()
+        return self.__value >= other.__value
 
     @staticmethod
     def len():
@@ -104,20 +128,47 @@ class Dignity:  # Номинал, достоинство
 
     @staticmethod
     def sequence():
-        return (Dignity(n) for n in range(Dignity.len()))
+        return iter(Dignity.__dignities)
 
     @staticmethod
     def name(string):
         assert isinstance(string, str)
-        return Dignity(Dignity.__names.index(string)) if string in Dignity.__names else None
+        return Dignity.__by_name.get(string)
+
+
+Dignity._intern()
 
 
 ####################
-class Card:  # Карта
+class Card:  # Карта. Все 36 карт - заранее созданные единственные экземпляры.
+    # Номер карты: достоинство * 4 + масть. Младшие два бита - масть, старшие - достоинство.
+    # Поэтому у карт одной масти номер растёт вместе с достоинством.
 
-    def __init__(self, dignity, suit):
+    __cards = []  # Все карты по номеру.
+    __by_name = {}  # Карты по названию "Карта-масть".
+    __slots__ = '__id', '__value', '__name', '__just'
+
+    def __new__(cls, dignity, suit):
         assert isinstance(dignity, Dignity) and isinstance(suit, Suit)
-        self.__value = dignity, suit
+        return Card.__cards[dignity.value() * Suit.len() + suit.value()]
+
+    @staticmethod
+    def _intern():  # Создание всех карт. Вызывается один раз при импорте модуля.
+        for dignity in Dignity.sequence():
+            for suit in Suit.sequence():
+                card = object.__new__(Card)
+                card.__id = len(Card.__cards)
+                card.__value = dignity, suit
+                card.__name = '{}-{}'.format(dignity, suit)
+                card.__just = '{}-{}'.format(dignity.just(), suit.just())
+                Card.__cards.append(card)
+                Card.__by_name[card.__name] = card
+
+    def __reduce__(self):  # Для pickle: восстанавливать тот же единственный экземпляр.
+        return Card.by_id, (self.__id,)
+
+    def id(self):  # Номер карты 0..35.
+        return self.__id
 
     def value(self):
         return self.__value
@@ -129,56 +180,176 @@ class Card:  # Карта
         return self.__value[1]
 
     def cover(self, card, trump_suit=None):
-        assert isinstance(card, Card)
-        assert trump_suit is None or isinstance(trump_suit, Suit)
-        self_dignity, self_suit = self.value()
-        card_dignity, card_suit = card.value()
-
-        if self_suit == card_suit:  # Если масти одинаковые
-            return self_dignity > card_dignity  # Если старше достоинство
+        if (self.__id ^ card.__id) & 3 == 0:  # Если масти одинаковые
+            return self.__id > card.__id  # Если старше достоинство
         else:  # Масти разные
-            return trump_suit is not None and self_suit == trump_suit  # Если козырь
+            return trump_suit is not None and self.__id & 3 == trump_suit.value()  # Если козырь
 
     def __str__(self):
-        dignity, suit = self.__value
-        return '{}-{}'.format(dignity, suit)
+        return self.__name
 
     def __repr__(self):
-        dignity, suit = self.__value
-        return '{}-{}'.format(dignity, suit)
+        return self.__name
 
     def just(self):
-        dignity, suit = self.__value
-        return '{}-{}'.format(dignity.just(), suit.just())
+        return self.__just
 
-    def __eq__(self, other):  # x == y
-        assert isinstance(other, Card)
-        return self.value() == other.value()
+    # Карты единственны, поэтому равенство - это тождество (__eq__ от object).
 
     def __hash__(self):
-        dignity, suit = self.__value
-        return dignity.value() * Suit.len() + suit.value()
+        return self.__id
+
+    @staticmethod
+    def len():
+        return len(Card.__cards)
+
+    @staticmethod
+    def by_id(n):  # Карта по номеру.
+        return Card.__cards[n]
+
+    @staticmethod
+    def sequence():
+        return iter(Card.__cards)
 
     @staticmethod
     def name(string):
         assert isinstance(string, str)
-        names = string.split('-')
-        if len(names) == 2:
-            name_dignity, name_suit = names
-            dignity = Dignity.name(name_dignity)
-            suit = Suit.name(name_suit)
-            if dignity and suit:  # Если оба не None
-                return Card(dignity, suit)
-        # return None  # Во всех остальных случаях
+        return Card.__by_name.get(string)
+
+
+Card._intern()
+
+
+######################################################################
+# Наборы карт битовыми масками: бит с номером карты установлен, если карта в наборе.
+ALL_CARDS = (1 << Card.len()) - 1  # Все 36 карт.
+CARDS = tuple(Card.sequence())  # Карты по номерам: CARDS[n] - то же, что Card.by_id(n).
+STATE_VERSION = 1  # Версия формата Game.dumps().
+SUIT_MASKS = tuple(0x111111111 << suit for suit in range(Suit.len()))  # Все карты каждой масти.
+DIGNITY_MASKS = tuple(0xF << dignity * Suit.len() for dignity in range(Dignity.len()))  # Карты каждого достоинства.
+# COVER_MASKS[козырь][номер карты] - все карты, которыми её можно побить.
+# Та же масть старше - биты выше карты в маске масти; иначе любой козырь (см. Card.cover).
+COVER_MASKS = tuple(tuple(SUIT_MASKS[card & 3] >> card + 1 << card + 1 | (SUIT_MASKS[trump] if card & 3 != trump else 0)
+                          for card in range(Card.len())) for trump in range(Suit.len()))
+
+# События партии (Game.events, Game.play). Текст ответа, как у Game.command, по ним строит render().
+Message = namedtuple('Message', 'text')  # Ответ на команду, которая не ход: справка, сведения, ошибка.
+CardPlayed = namedtuple('CardPlayed', 'gamer card')  # Ход картой. gamer - ходил игрок, иначе Болван.
+Pass = namedtuple('Pass', 'gamer')  # Пас.
+Take = namedtuple('Take', 'gamer')  # Взял.
+Dealt = namedtuple('Dealt', 'hand')  # Была раздача. hand - карты игрока после неё (кортеж в порядке получения).
+GameOver = namedtuple('GameOver', 'winner')  # Игра окончена: 'Gamer', 'Dummy' или None - ничья.
+# События ходов неизменяемы и заранее созданы, как и карты: PLAYED[gamer][номер карты], PASSES[gamer], TAKES[gamer].
+PLAYED = tuple(tuple(CardPlayed(gamer, card) for card in CARDS) for gamer in (False, True))
+PASSES = Pass(False), Pass(True)
+TAKES = Take(False), Take(True)
+
+
+def hand_text(cards):  # Вид руки: "[карта, карта, ...]". Кэширует его сама рука (Hand.just).
+    return '[' + ', '.join(str(card) for card in cards) + ']'
+
+
+def render(events):  # Текст ответа по событиям: ходы Болвана, рука после раздачи, GameOver:... в конце.
+    string = ''
+    for event in events:
+        kind = type(event)
+        if kind is CardPlayed:
+            if not event.gamer:  # Ходы игрока в ответе не повторяются.
+                string += str(event.card) + '\n'
+        elif kind is Dealt:
+            string += hand_text(event.hand) + '\n'
+        elif kind is Message:
+            string += event.text
+        elif kind is GameOver:
+            string += 'GameOver:' + str(event.winner)
+        elif not event.gamer:
+            string += 'Пас\n' if kind is Pass else 'Взял\n'
+    return string
+
+
+def lowest_card(mask):  # Номер младшей карты набора (младшее достоинство, затем масть).
+    return (mask & -mask).bit_length() - 1
+
+
+def mask_cards(mask):  # Карты набора по возрастанию номера.
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(Card.by_id(low.bit_length() - 1))
+        mask ^= low
+    return cards
 
 
 #####################
-class Deck:  # Колода
+class Deck:  # Колода. Хранит не карты, а ходы тасовки и число оставшихся карт: карты вычисляются при раздаче.
+    # Тасовка - та же, что random.shuffle (Фишер-Йетс): на шаге i = 35..1 карта из позиции j <= i меняется
+    # местами с картой в позиции i. Берут карты с конца, а позиция i после шага i уже не меняется,
+    # поэтому шаг тасовки можно делать в момент раздачи карты. codes[k] - j шага для k-той розданной карты.
+    # Ходы тасовки - это номер перестановки (0..36!-1) в смешанной системе счисления, см. index().
+
+    def __init__(self, rng=None, order=None, index=None):
+        # rng - свой генератор random.Random для воспроизводимой партии. order - готовый порядок карт (см. cards()).
+        # index - номер перестановки (см. index()).
+        assert rng is None or isinstance(rng, random.Random)
+        if order is not None:
+            assert sorted(card.id() for card in order) == list(range(Card.len()))
+            self.__codes = Deck.__encode([card.id() for card in order])
+        elif index is not None:
+            self.__codes = Deck.__decode(index)
+        else:  # Те же вызовы генератора, что делает shuffle: партия Game(random.Random(n)) не меняется.
+            randrange = (rng or random).randrange
+            self.__codes = bytes([randrange(i + 1) for i in range(Card.len() - 1, 0, -1)] + [0])
+        self.__len = Card.len()
+        self.__current = bytearray(range(Card.len()))  # Номера карт по позициям после сделанных шагов тасовки.
+        # Козырная - карта, которая после всех шагов окажется в позиции 0. Идём по шагам назад (i = 1..35):
+        # позицию position меняет только шаг, где j == position, и она становится i > всех прежних.
+        steps = self.__codes[::-1]  # steps[i] - j шага i.
+        position = i = 0
+        while True:
+            i = steps.find(position, i + 1)
+            if i < 0:
+                break
+            position = i
+        self.__trump_card = CARDS[position]
 
-    def __init__(self):
-        self.__deck = [Card(dignity, suit) for dignity in Dignity.sequence() for suit in Suit.sequence()]
-        shuffle(self.__deck)
-        self.__trump_card = self.__deck[0]
+    @staticmethod
+    def __encode(order):  # Ходы тасовки, которые дают порядок order.
+        current = list(range(Card.len()))
+        position = list(range(Card.len()))
+        codes = []
+        for i in range(Card.len() - 1, -1, -1):
+            j = position[order[i]]
+            codes.append(j)
+            current[i], current[j] = current[j], current[i]
+            position[current[i]], position[current[j]] = i, j
+        return bytes(codes)
+
+    @staticmethod
+    def __decode(index):  # Ходы тасовки по номеру перестановки.
+        assert isinstance(index, int) and 0 <= index
+        codes = []
+        for i in range(Card.len() - 1, -1, -1):
+            index, j = divmod(index, i + 1)
+            codes.append(j)
+        assert index == 0, 'Номер перестановки больше 36!-1'
+        return bytes(codes)
+
+    @staticmethod
+    def rest(cards, trump_card):  # Колода из оставшихся карт cards (первая - нижняя) и козырной карты партии.
+        assert isinstance(trump_card, Card) and len(cards) <= Card.len()
+        deck = object.__new__(Deck)
+        ids = [card.id() for card in cards]
+        deck.__codes = bytes(range(Card.len() - 1, -1, -1))  # Шаги тасовки ничего не переставляют.
+        deck.__len = len(ids)
+        deck.__current = bytearray(ids + [0] * (Card.len() - len(ids)))
+        deck.__trump_card = trump_card
+        return deck
+
+    def index(self):  # Номер перестановки: Deck(index=deck.index()) - та же колода до раздачи.
+        index = 0
+        for i, j in enumerate(reversed(self.__codes)):
+            index = index * (i + 1) + j
+        return index
 
     def trump_suit(self):  # Козырная масть
         return self.__trump_card.suit()
@@ -187,13 +358,39 @@ class Deck:  # Колода
         return self.__trump_card
 
     def len(self):
-        return len(self.__deck)
+        return self.__len
+
+    def cards(self):  # Оставшиеся карты: первая - козырная, берут с конца.
+        current = self.__current[:self.__len]
+        for i in range(self.__len - 1, 0, -1):
+            j = self.__codes[Card.len() - 1 - i]
+            current[i], current[j] = current[j], current[i]
+        return tuple(CARDS[n] for n in current)
+
+    def __draw(self):  # Верхняя карта. Делает последний нужный для неё шаг тасовки.
+        current = self.__current
+        j = self.__codes[Card.len() - self.__len]
+        self.__len -= 1
+        card = current[j]
+        current[j] = current[self.__len]
+        return CARDS[card]
 
     def get_cards(self, n=1):
         assert isinstance(n, int)
         assert n > 0
-        n = min(n, self.len())
-        return [self.__deck.pop() for _ in range(n)]
+        if n == 1:  # Обычный случай - без списка для range.
+            return [self.__draw()] if self.__len else []
+        return [self.__draw() for _ in range(min(n, self.__len))]
+
+    def deal(self, first, second):  # Добор до first и second карт: по одной по очереди, начиная с первого.
+        assert isinstance(first, int) and isinstance(second, int)
+        first_cards, second_cards = [], []
+        for turn in range(max(first, second, 0)):
+            if turn < first and self.__len:
+                first_cards.append(self.__draw())
+            if turn < second and self.__len:
+                second_cards.append(self.__draw())
+        return first_cards, second_cards
 
 
 ###########################################################################
@@ -203,6 +400,10 @@ class Table:  # Стол на который кидают карты. Следи
         assert isinstance(trump_card, Card)
         self.trump_card = trump_card
         self.cards = []
+        self.__just = None  # Готовый вид стола для just(). None - нужно построить заново.
+        self.mask = 0  # Карты на столе битовой маской.
+        self.dignities = 0  # Все карты достоинств, лежащих на столе. Ими можно подкидывать.
+        self.__cover = COVER_MASKS[trump_card.suit().value()]  # Чем бить каждую карту при этом козыре.
 
     def trump_suit(self):  # Козырная масть
         return self.trump_card.suit()
@@ -216,32 +417,41 @@ class Table:  # Стол на который кидают карты. Следи
     def is_attack(self):
         return len(self.cards) % 2 == 0  # Если атака. Четный ход.
 
-    def check(self, card):
-        assert isinstance(card, Card)
+    def legal_moves(self, mask=ALL_CARDS):  # Маска карт из набора mask, которыми сейчас можно ходить.
         count_cards = len(self.cards)
 
         if count_cards == 0:  # Если список пуст. Первый ход любая карта.
-            return True
+            return mask
 
         if count_cards % 2:  # Если нужно отбиватся. Нечетный ход.
-            return card.cover(self.cards[-1], self.trump_card.suit())  # Если можно побить последнюю карту.
+            return mask & self.__cover[self.cards[-1].id()]  # Чем можно побить последнюю карту.
         else:  # Если нужно ходить. Четный ход.
-            return card.dignity() in {card.dignity() for card in self.cards}  # Только уже присутствующего достоинства.
+            return mask & self.dignities  # Только уже присутствующего достоинства.
+
+    def check(self, card):
+        assert isinstance(card, Card)
+        return self.legal_moves(1 << card.id()) != 0
 
     def go(self, card):
         assert isinstance(card, Card)
         check = self.check(card)
         if check:
             self.cards.append(card)
+            self.__just = None
+            self.mask |= 1 << card.id()
+            self.dignities |= DIGNITY_MASKS[card.id() >> 2]
         return check
 
     def get_all_card(self):
         temp = self.cards
-        self.cards = []
+        self.clear()
         return temp
 
     def clear(self):
         self.cards = []
+        self.__just = None
+        self.mask = 0
+        self.dignities = 0
 
     def __str__(self):
         return ' '.join(str(card) for card in self.cards)
@@ -250,6 +460,8 @@ class Table:  # Стол на который кидают карты. Следи
         return ' '.join(str(card) for card in self.cards)
 
     def just(self):
+        if self.__just is not None:  # Стол не менялся с прошлого раза.
+            return self.__just
         go = len(self.cards) % 2  # Четность хода. Определяет атакуют сейчас или отбиваются
         s0, s1 = self.cards[0::2], self.cards[1::2]  # Четная и нечетная последовательности
         dummy = s0 if go else s1   # Последовательность Болвана всегда первая
@@ -260,6 +472,7 @@ class Table:  # Стол на который кидают карты. Следи
         string += '|\n|'
         string += '|'.join(card.just() for card in gamer)
         string += '|'
+        self.__just = string
         return string
 
 
@@ -267,15 +480,24 @@ class Table:  # Стол на который кидают карты. Следи
 class Hand:  # Рука с картами
 
     def __init__(self):
-        self.cards = []
+        self.cards = []  # Карты в порядке получения. В таком порядке и показываются.
+        self.mask = 0  # Те же карты битовой маской.
+        self.__just = '[]'  # Готовый вид руки для just(). None - нужно построить заново.
+        self.__snapshot = ()  # Карты кортежем для snapshot(). None - нужно построить заново.
 
     def exist(self, card):
         assert isinstance(card, Card)
-        return card in self.cards
+        return self.mask >> card.id() & 1 == 1
 
     def get_card(self, card):
         assert isinstance(card, Card)
-        return self.cards.pop(self.cards.index(card)) if card in self.cards else None
+        if not self.mask >> card.id() & 1:
+            return None
+        self.cards.remove(card)
+        self.mask ^= 1 << card.id()
+        self.__just = None
+        self.__snapshot = None
+        return card
 
     def len(self):
         return len(self.cards)
@@ -284,48 +506,127 @@ class Hand:  # Рука с картами
         assert isinstance(cards, (list, tuple))
         for card in cards:
             assert isinstance(card, Card)
-        self.cards.extend(cards)
+            self.mask |= 1 << card.id()
+        if cards:
+            self.cards.extend(cards)
+            self.__just = None
+            self.__snapshot = None
+
+    def legal_moves(self, table):  # Все карты руки, которыми сейчас можно ходить.
+        assert isinstance(table, Table)
+        return mask_cards(table.legal_moves(self.mask))
 
     def __str__(self):
         return ' '.join(str(card) for card in self.cards)
 
+    def snapshot(self):  # Карты кортежем. Один и тот же объект, пока рука не изменилась.
+        if self.__snapshot is None:
+            self.__snapshot = tuple(self.cards)
+        return self.__snapshot
+
     def just(self):
-        return '[' + ', '.join(str(card) for card in self.cards) + ']'
+        if self.__just is None:  # Рука изменилась с прошлого раза.
+            self.__just = hand_text(self.snapshot())
+        return self.__just
 
     def __repr__(self):
         return ' '.join(str(card) for card in self.cards)
 
     def __contains__(self, card):
         assert isinstance(card, Card)
-        return card in self.cards
+        return self.mask >> card.id() & 1 == 1
+
+
+##############################################
+class Knowledge:  # Что видно обоим игрокам: отбой, известные карты в руках, козырная карта под колодой.
+    # Игрок 0 - игрок, 1 - Болван. known[p] - карты в руке p, которые видел соперник: взятые со стола
+    # и козырная, если досталась p последней. Обновляется за O(1) на ход в Game.next_go.
+
+    __slots__ = 'discard', 'known', 'trump'
+
+    def __init__(self, trump_card):
+        assert isinstance(trump_card, Card)
+        self.discard = 0  # Отбой: карты, ушедшие со стола при Пасе.
+        self.known = [0, 0]
+        self.trump = 1 << trump_card.id()  # Козырная карта, пока она в колоде. Потом 0.
+
+    def played(self, player, card):  # player пошёл картой card.
+        self.known[player] &= ~(1 << card.id())
+
+    def took(self, player, table):  # player взял со стола маску table.
+        self.known[player] |= table
+
+    def passed(self, table):  # Пас: стол table ушёл в отбой.
+        self.discard |= table
+
+    def dealt(self, deck_len, gamer_mask):  # После раздачи: кому досталась козырная карта.
+        if self.trump and deck_len == 0:
+            self.known[0 if gamer_mask & self.trump else 1] |= self.trump
+            self.trump = 0
+
+    def unseen(self, player, hand, table):  # Карты, которых player не видел: у соперника (кроме known) и в колоде.
+        return ALL_CARDS & ~(self.discard | self.known[1 - player] | self.trump | hand | table)
+
+
+###########################################
+class Policy:  # Стратегия Болвана. Подключается в Game(policy=...).
+
+    def choose(self, game):  # Ход Болвана: годная карта из его руки или None (Пас при атаке, Взял при защите).
+        raise NotImplementedError
+
+    def observe(self, game, gamer, card):  # Сделан ход: карта уже на столе; None - Пас или Взял, стол ещё не убран.
+        pass
+
+
+##############################################
+class Dummy(Policy):  # Ходит младшей из годных карт, козырями - в последнюю очередь.
+
+    def choose(self, game):
+        suitable = game.table.legal_moves(game.hand_dummy.mask)  # Годные карты.
+        moves = suitable & ~SUIT_MASKS[game.table.trump_suit().value()] or suitable  # Не козыри, иначе козыри.
+        return Card.by_id(lowest_card(moves)) if moves else None
 
 
 ######################################################
 class Game:  # Партия в игре. Да собственно, вся игра)
 
-    def __init__(self):
+    commands = {  # Все команды: название -> имя метода. Один словарь на все партии.
+        'Карты': 'command_dignity',
+        'Масти': 'command_suit',
+        'Команды': 'command_commands',
+        'Игра': 'command_description',
+        'Козырь': 'command_trump',
+        'Рука': 'command_hand',
+        'cheat': 'command_cheat',  # Недокументированная команда. Подсмотреть карты)
+        'Болван': 'command_dummy',
+        'Колода': 'command_deck',
+        'Программа': 'command_about',
+        'Стол': 'command_table',
+        'Инфо': 'command_info',
+        'Пас': 'command_pass',
+        'Взял': 'command_get',
+    }
+
+    def __init__(self, rng=None, policy=None, deck=None, recorder=None, metrics=None):
+        # rng - генератор для тасовки колоды: Game(random.Random(n)) - партия номер n. Или сразу готовая deck.
+        # recorder - запись партии (см. fool_record.Recorder): start(колода), action(карта, атака), finish().
+        # metrics - счётчики и задержки (см. fool_metrics.Metrics): count(имя, метка, n), observe(имя, метка, с).
+        assert policy is None or isinstance(policy, Policy)
+        assert deck is None or isinstance(deck, Deck)
+        self.policy = policy or Dummy()  # Стратегия Болвана.
+        self.recorder = recorder
+        self.metrics = metrics
         self.hand_gamer = Hand()  # Рука игрока.
         self.hand_dummy = Hand()  # Рука "Болвана".
-        self.deck = Deck()  # Карточная колода.
+        self.deck = deck or Deck(rng)  # Карточная колода.
+        if recorder is not None:
+            recorder.start(self.deck.cards())
         self.table = Table(self.deck.trump_card())  # Стол для игры с объявленным козырем.
+        self.knowledge = Knowledge(self.deck.trump_card())  # Открытые сведения о картах.
         self.distribution_cards()  # Раздача карт (до 6-ти).
-        self.commands = {}  # Собираем все команды в словарь.
-        self.commands.update({'Карты': self.command_dignity})
-        self.commands.update({'Масти': self.command_suit})
-        self.commands.update({'Команды': self.command_commands})
-        self.commands.update({'Игра': self.command_description})
-        self.commands.update({'Козырь': self.command_trump})
-        self.commands.update({'Рука': self.command_hand})
-        self.commands.update({'cheat': self.command_cheat})  # Недокументированная команда. Подсмотреть карты)
-        self.commands.update({'Болван': self.command_dummy})
-        self.commands.update({'Колода': self.command_deck})
-        self.commands.update({'Программа': self.command_about})
-        self.commands.update({'Стол': self.command_table})
-        self.commands.update({'Инфо': self.command_info})
-        self.commands.update({'Пас': self.command_pass})
-        self.commands.update({'Взял': self.command_get})
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def hello():  # Приветствие - выдаст текст "Добро пожаловать в игру".
         string = ''
         string += 'Добро пожаловать в игру "Подкидной Дурак"!\n'
@@ -335,6 +636,7 @@ class Game:  # Партия в игре. Да собственно, вся иг
         return string
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def command_commands():  # Команды - выдаст справку о командах
         string = ''
         string += 'Доступны следующие команды:\n'
@@ -356,14 +658,17 @@ class Game:  # Партия в игре. Да собственно, вся иг
         return string
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def command_dignity():  # Достоинства - перечислит все возможные достоинства карт.
         return ', '.join(str(dignity) for dignity in Dignity.sequence()) + '.\n'
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def command_suit():  # Масти - перечислит все возможные масти.
         return ', '.join(str(suit) for suit in Suit.sequence()) + '.\n'
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def command_description():  # Игра - выдаст краткие правила игры.
         string = ''
         string += 'В начале игры на руках противников по 6 карт.\n'
@@ -413,6 +718,7 @@ class Game:  # Партия в игре. Да собственно, вся иг
         return 'Карт в колоде: ' + str(self.deck.len()) + '\n'
 
     @staticmethod
+    @lru_cache(maxsize=None)  # Текст не меняется: строится один раз.
     def command_about():  # Программа - выдаст информацию об этой программе и её разработчиках.
         string = ''
         string += 'Программа разработана Дмитрием Аристарховым, по заданию Дмитрия Ермилова,\n'
@@ -438,19 +744,79 @@ class Game:  # Партия в игре. Да собственно, вся иг
         assert isinstance(first_gamer, bool)
         h1 = self.hand_gamer if first_gamer else self.hand_dummy
         h2 = self.hand_dummy if first_gamer else self.hand_gamer
-        last_len = 0
-        while last_len != self.deck.len():  # Если карты уже не берут.
-            last_len = self.deck.len()
-            if h1.len() < 6:
-                h1.add_cards(self.deck.get_cards())  # Не страшно раздавать, если что, из пустой колоды)
-            if h2.len() < 6:
-                h2.add_cards(self.deck.get_cards())
+        first, second = self.deck.deal(6 - h1.len(), 6 - h2.len())  # Не страшно раздавать из пустой колоды)
+        h1.add_cards(first)
+        h2.add_cards(second)
+        self.knowledge.dealt(self.deck.len(), self.hand_gamer.mask)
+        if self.metrics is not None:  # Сколько карт роздано.
+            self.metrics.count('distribution_cards', n=len(first) + len(second))
+
+    def dumps(self):  # Позиция партии байтами (без pickle): несколько десятков байт.
+        # Версия, козырная карта, затем колода (снизу вверх), рука игрока, рука Болвана и стол - каждое числом карт
+        # и номерами карт по порядку, затем маски Knowledge: отбой и известные карты игрока и Болвана по 5 байт.
+        # Стратегия Болвана, запись и метрики не сохраняются.
+        data = bytearray((STATE_VERSION, self.deck.trump_card().id()))
+        for cards in self.deck.cards(), self.hand_gamer.cards, self.hand_dummy.cards, self.table.cards:
+            data.append(len(cards))
+            data.extend(card.id() for card in cards)
+        for mask in self.knowledge.discard, self.knowledge.known[0], self.knowledge.known[1]:
+            data += mask.to_bytes(5, 'little')
+        return bytes(data)
+
+    @staticmethod
+    def loads(data, policy=None, metrics=None):  # Партия из Game.dumps(). Ходы продолжаются с того же места.
+        assert data[0] == STATE_VERSION, 'Неизвестная версия позиции партии'
+        position = 2
+        parts = []
+        for _ in range(4):
+            size = data[position]
+            parts.append([CARDS[n] for n in data[position + 1:position + 1 + size]])
+            position += 1 + size
+        game = object.__new__(Game)
+        game.policy = policy or Dummy()
+        game.recorder = None
+        game.metrics = metrics
+        game.deck = Deck.rest(parts[0], CARDS[data[1]])
+        game.hand_gamer = Hand()
+        game.hand_gamer.add_cards(parts[1])
+        game.hand_dummy = Hand()
+        game.hand_dummy.add_cards(parts[2])
+        game.table = Table(game.deck.trump_card())
+        for card in parts[3]:
+            went = game.table.go(card)  # Ход делается и при python -O: в assert только проверка.
+            assert went
+        game.knowledge = Knowledge(game.deck.trump_card())
+        game.knowledge.discard, game.knowledge.known[0], game.knowledge.known[1] = (
+            int.from_bytes(data[position + n:position + n + 5], 'little') for n in (0, 5, 10))
+        if not game.deck.len():
+            game.knowledge.trump = 0
+        return game
+
+    def stats(self):  # Метрики партии (см. fool_metrics.Metrics.stats). Без метрик - пустой словарь.
+        return self.metrics.stats() if self.metrics is not None else {}
 
     def command(self, string):  # Интерпритатор команд.
+        result = self.timed(string)
+        return result if type(result) is str else render(result)
+
+    def events(self, string):  # Команда как в command(), но ответ - список событий, без текста.
+        result = self.timed(string)
+        return [Message(result)] if type(result) is str else result
+
+    def timed(self, string):  # execute() с замером времени, если подключены метрики.
         assert isinstance(string, str)
+        if self.metrics is None:
+            return self.execute(string)
+        start = perf_counter()
+        result = self.execute(string)
+        kind = string if string in self.commands else 'Карта' if string.find('-') != -1 else 'Неизвестная'
+        self.metrics.observe('command', kind, perf_counter() - start)
+        return result
+
+    def execute(self, string):  # Выполнить команду без замеров. Ход - список событий, остальное - сразу текст.
         if string.find('-') == -1:  # Нет деффиса - значит не карта)
             if string in self.commands:
-                return self.commands[string]()
+                return getattr(self, self.commands[string])()
             else:
                 return 'Неизвестная команда.\n'
 
@@ -466,8 +832,22 @@ class Game:  # Партия в игре. Да собственно, вся иг
             if not self.table.check(card):
                 return 'Так ходить нельзя.\n'
 
+            return self.__go(card)
+
+    def play(self, card):  # Ход игрока: годная карта или None (Пас при атаке, Взял при защите). Список событий.
+        # Без проверок с текстом ошибки, как у command(): для ботов, которые ходят только годными ходами.
+        if card is not None:
+            assert self.hand_gamer.exist(card) and self.table.check(card)
+        else:
+            assert not self.table.is_attack() or self.table.len() > 0  # Первым ходом пасовать нельзя.
+        return self.__go(card)
+
+    def __go(self, card):  # Ход игрока уже проверен.
+        if card is not None:
             self.table.go(self.hand_gamer.get_card(card))
-            return self.next_go(gamer=True, card=card)
+        events = []
+        self.next_go(gamer=True, card=card, events=events)
+        return events
 
     def command_pass(self):  # Пас - сообщаете игре что больше не будете подкидывать карты.
         if not self.table.is_attack():  # Если нужно отбиватся. Нечетный ход.
@@ -475,50 +855,60 @@ class Game:  # Партия в игре. Да собственно, вся иг
         if self.table.len() == 0:  # Перый ход.
             return 'Нельзя пасовать первым ходом.\n'
 
-        return self.next_go(gamer=True, card=None)
+        return self.__go(None)
 
     def command_get(self):  # Взял - сообщаете игре что больше не будете отбиваться.
         if self.table.is_attack():  # Если нужно подкидывать. Четный ход.
             return 'Нельзя взять когда атакуешь.\n'
 
-        return self.next_go(gamer=True, card=None)
-
-    def dummy(self):  # Искусственный интеллект) Ходит первой попавшейся из минимальных по достоинству.
-        suitable_cards = {card for card in self.hand_dummy.cards if self.table.check(card)}  # Годные карты.
-        trump_suitable_cards = {card for card in suitable_cards if card.suit() == self.table.trump_suit()}  # Козыри.
-        suitable_cards -= trump_suitable_cards  # Не козыри.
-
-        card = None
-        if suitable_cards:
-            card = min(suitable_cards, key=lambda card: card.dignity())
-        elif trump_suitable_cards:
-            card = min(trump_suitable_cards, key=lambda card: card.dignity())
+        return self.__go(None)
 
+    def dummy(self, events):  # Искусственный интеллект) Ход выбирает стратегия self.policy.
+        if self.metrics is None:
+            card = self.policy.choose(self)
+        else:
+            start = perf_counter()
+            card = self.policy.choose(self)
+            self.metrics.observe('dummy', type(self.policy).__name__, perf_counter() - start)
         if card is not None:
+            assert self.hand_dummy.exist(card) and self.table.check(card)
             self.table.go(self.hand_dummy.get_card(card))
-        return self.next_go(gamer=False, card=card)
+        self.next_go(gamer=False, card=card, events=events)
 
-    def next_go(self, *, gamer, card):  # Подготовка к следующему ходу.
+    def next_go(self, *, gamer, card, events):  # Подготовка к следующему ходу. События дописываются в events.
         assert isinstance(gamer, bool)
         assert isinstance(card, Card) or card is None
+        self.policy.observe(self, gamer, card)
 
         attack = self.table.is_attack() if card is None else not self.table.is_attack()
+        events.append(PLAYED[gamer][card.id()] if card is not None else PASSES[gamer] if attack else TAKES[gamer])
+        if self.recorder is not None:
+            self.recorder.action(card, attack)
         distribution = False  # Нужна ли пересдача.
         ticket = False  # Право внеочередного хода.
+        player = 0 if gamer else 1
         if card is not None:  # Если ход картой.
+            self.knowledge.played(player, card)
             if not attack:  # Если защита (При атаке противник должен отбиватся и это следующий ход).
                 if self.hand_gamer.len() == 0 or self.hand_dummy.len() == 0:  # Если у кого нибудь закончились карты.
                     distribution = True  # Пересдача карт нужна.
                     ticket = True  # Молодец, отбился. Теперь ходи первый.
         else:  # Если ход не картой: Пас или Взял.
             if not attack:  # Если защита(Взял).
+                self.knowledge.took(player, self.table.mask)
                 if gamer:  # Если взял игрок.
                     self.hand_gamer.add_cards(self.table.get_all_card())  # Все карты со стола ему в руку.
                 else:  # Если взял Болван.
                     self.hand_dummy.add_cards(self.table.get_all_card())  # Все карты со стола ему в руку.
             else:
+                self.knowledge.passed(self.table.mask)
                 self.table.clear()  # Очистить стол.
             distribution = True  # Пересдача карт нужна.
+        if self.metrics is not None:  # По какой ветке пошёл ход.
+            if card is not None:
+                self.metrics.count('next_go', 'Атака' if attack else 'Отбился' if ticket else 'Защита')
+            else:
+                self.metrics.count('next_go', 'Пас' if attack else 'Взял')
 
         the_end = False  # Закончена ли игра.
         if distribution:  # Если установлен флаг.
@@ -528,32 +918,23 @@ class Game:  # Партия в игре. Да собственно, вся иг
             else:  # Карты в колоде не закончились.
                 self.distribution_cards(gamer if not ticket else not gamer)  # Начинаем с того кто сейчас ходил.
 
-        string = ''  # Вернём эту строку
-        if not gamer:  # Ходил Болван. Вернуть этот ход.
-            if card is not None:  # Если ход картой.
-                string += str(card) + '\n'
-            else:  # Если ход не картой: Пас или Взял.
-                if attack:  # Если атака(Пас).
-                    string += 'Пас\n'
-                else:  # Если защита(Взял).
-                    string += 'Взял\n'
-
         if the_end:  # Игра закончена!
+            if self.recorder is not None:
+                self.recorder.finish()
+            if self.metrics is not None:
+                self.metrics.count('game_over')
             if self.hand_gamer.len() == 0 and self.hand_dummy.len() == 0:  # Ничья.
-                string += 'GameOver:None'
-                return string
-            if self.hand_gamer.len() == 0:  # Поздравляю с победой над Болваном!
-                string += 'GameOver:Gamer'
-                return string
-            if self.hand_dummy.len() == 0:  # Это фиаско, братан.
-                string += 'GameOver:Dummy'
-                return string
-            assert False  # Не знаю как ты здесь оказался.
+                events.append(GameOver(None))
+            elif self.hand_gamer.len() == 0:  # Поздравляю с победой над Болваном!
+                events.append(GameOver('Gamer'))
+            elif self.hand_dummy.len() == 0:  # Это фиаско, братан.
+                events.append(GameOver('Dummy'))
+            else:
+                assert False  # Не знаю как ты здесь оказался.
+            return
 
         if distribution:  # Если была раздача, вернуть руку для удобства.
-            string += self.command_hand()
+            events.append(Dealt(self.hand_gamer.snapshot()))
 
-        if (gamer and not ticket) or (not gamer and ticket):  # Вернуть новый ход Болвана.
-            string += self.dummy()
-
-        return string
+        if (gamer and not ticket) or (not gamer and ticket):  # Новый ход Болвана.
+            self.dummy(events)
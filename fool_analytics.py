@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# Вероятность победы первого игрока при игре Болван против Болвана, когда порядок колоды неизвестен.
+# Известно то, что видно после раздачи: руки, стол и козырная карта под колодой. Неизвестные карты колоды
+# перебираются все, если их не больше EXACT, иначе - стратифицированная выборка: слой - верхняя карта колоды,
+# в каждом слое поровну случайных раскладов остальных карт.
+# Оценки раздач запоминаются по каноническому ключу: некозырные масти переставлены так, чтобы ключ был наименьшим.
+# Болван при равных картах выбирает младшую масть, поэтому перестановка мастей может изменить ход партии,
+# и оценка по ключу - приближение (на тысячах раздач расходится с точной не больше, чем шум выборки).
+# Честные раздачи для рейтинговых игр - номера партий, где оценка близка к 1/2: fair_seeds().
+import math
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from random import Random
+
+import fool_engine
+from card_game_fool import Card, Suit, SUIT_MASKS
+
+EXACT = 6  # До скольких неизвестных карт колоды перебирать все расклады (6! = 720 партий).
+PER_STRATUM = 2  # Раскладов на слой выборки по умолчанию.
+MAX_CACHE = 100000  # Сколько оценок раздач помнит Analyzer (вытесняются давно не нужные).
+UNKNOWN = Card.len() - 2 * fool_engine.HAND_SIZE - 1  # Неизвестных карт колоды после раздачи (слоёв выборки).
+
+# win, draw - доли побед первого игрока и ничьих, games - сколько партий сыграно для оценки, exact - перебор.
+Estimate = namedtuple('Estimate', 'win draw games exact')
+
+
+def score(estimate):  # Ожидаемые очки первого игрока: победа 1, ничья 1/2.
+    return estimate.win + estimate.draw / 2
+
+
+def playout(engine, state, order):  # Доиграть Болванами от state с колодой order. Победитель или None.
+    engine.restore(state)
+    engine.order = order
+    while not engine.over:
+        engine.move(fool_engine.dummy(engine, engine.legal()))
+    return engine.winner
+
+
+def estimate(engine, per_stratum=PER_STRATUM, rng=None, exact=EXACT):  # Оценка позиции engine (Estimate).
+    # Колода engine.order[1:cursor] считается неизвестной, engine.order[0] - открытая козырная карта.
+    assert per_stratum > 0
+    state = engine.state()
+    engine = engine.copy()
+    trump, unknown = engine.order[:1], engine.order[1:engine.cursor]
+    if len(unknown) <= exact:
+        orders = (trump + list(rest) for rest in permutations(unknown))
+    else:
+        rng = rng or Random()
+        orders = []
+        for top in unknown:  # Слои равновероятны, и раскладов в них поровну: средняя по всем - средняя слоёв.
+            rest = [card for card in unknown if card != top]
+            for _ in range(per_stratum):
+                rng.shuffle(rest)
+                orders.append(trump + rest + [top])  # Берут с конца: top - первая карта добора.
+    wins = draws = games = 0
+    for order in orders:
+        winner = playout(engine, state, order)
+        games += 1
+        if winner is None:
+            draws += 1
+        elif winner == 0:
+            wins += 1
+    return Estimate(wins / games, draws / games, games, len(unknown) <= exact)
+
+
+def permute(mask, suits):  # Маска карт, где масть s заменена на suits[s].
+    result = 0
+    for suit, target in enumerate(suits):
+        part = mask & SUIT_MASKS[suit]
+        result |= part << target - suit if target >= suit else part >> suit - target
+    return result
+
+
+def canonical(hand0, hand1, trump_card):  # Наименьший ключ (козырная карта, рука 0, рука 1) по перестановкам
+    # некозырных мастей. Козырная масть остаётся на месте.
+    trump = trump_card & 3
+    others = [suit for suit in range(Suit.len()) if suit != trump]
+    best = None
+    for order in permutations(others):
+        suits = list(range(Suit.len()))
+        for suit, target in zip(others, order):
+            suits[suit] = target
+        key = trump_card, permute(hand0, suits), permute(hand1, suits)
+        if best is None or key < best:
+            best = key
+    return best
+
+
+def position(hand0, hand1, trump_card):  # Engine сразу после раздачи: руки известны, колода - остальные карты.
+    dealt = hand0 | hand1 | 1 << trump_card
+    rest = [card for card in range(Card.len()) if not dealt >> card & 1]
+    cards0 = [card for card in range(Card.len()) if hand0 >> card & 1]
+    cards1 = [card for card in range(Card.len()) if hand1 >> card & 1]
+    # Engine раздаёт с конца по одной карте, начиная с игрока 0.
+    tail = [card for pair in zip(cards0, cards1) for card in pair][::-1]
+    return fool_engine.Engine([trump_card] + rest + tail)
+
+
+#######################
+class Analyzer:  # Оценки раздач с памятью по каноническому ключу.
+    # Память окупается, когда одни и те же раздачи оцениваются снова (подсказки в партиях, повторные отчёты).
+    # Раздачи разных номеров партий почти никогда не совпадают по ключу: для просмотра номеров - max_cache=0.
+
+    def __init__(self, per_stratum=PER_STRATUM, exact=EXACT, symmetric=True, max_cache=MAX_CACHE):
+        assert per_stratum > 0 and max_cache >= 0
+        self.per_stratum = per_stratum
+        self.exact = exact
+        self.symmetric = symmetric  # False - ключ без перестановки мастей (точнее, но реже совпадает).
+        self.max_cache = max_cache
+        self.cache = OrderedDict()  # Ключ -> Estimate, от давно не нужных к недавним.
+        self.hits = 0
+
+    def key(self, engine):  # Ключ раздачи в начале партии engine.
+        assert engine.turns == 0
+        if self.symmetric:
+            return canonical(engine.hands[0], engine.hands[1], engine.order[0])
+        return engine.order[0], engine.hands[0], engine.hands[1]
+
+    def deal(self, order):  # Оценка раздачи с колодой order (как fool_engine.deal_order): видно только руки и козырь.
+        engine = fool_engine.Engine(order)
+        key = self.key(engine)
+        result = self.cache.get(key)
+        if result is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return result
+        # Генератор выборки задаётся ключом: оценка не зависит от порядка вызовов и числа процессов.
+        result = estimate(position(key[1], key[2], key[0]), self.per_stratum, Random(hash(key)), self.exact)
+        if self.max_cache:
+            self.cache[key] = result
+            if len(self.cache) > self.max_cache:
+                self.cache.popitem(last=False)
+        return result
+
+    def seed(self, n):  # Оценка раздачи партии номер n (Game(Random(n)), fool_engine.play(n)).
+        return self.deal(fool_engine.deal_order(n))
+
+
+_worker_analyzer = None  # Analyzer процесса пула fair_seeds.
+
+
+def start_worker(per_stratum):  # initializer пула fair_seeds. Номера партий не повторяются: оценки не запоминаются.
+    global _worker_analyzer
+    _worker_analyzer = Analyzer(per_stratum, max_cache=0)
+
+
+def scores(start, count, analyzer=None):  # Ожидаемые очки первого игрока в партиях start .. start + count - 1.
+    # analyzer - чем оценивать; по умолчанию - Analyzer процесса пула (start_worker).
+    analyzer = analyzer or _worker_analyzer
+    assert isinstance(analyzer, Analyzer)
+    return [score(analyzer.seed(n)) for n in range(start, start + count)]
+
+
+def samples_for(tolerance):  # Раскладов на слой, чтобы ошибка оценки была не больше tolerance / 2.
+    # Очки партии - от 0 до 1, их стандартное отклонение не больше 1/2: нужно 1 / tolerance**2 партий.
+    return max(1, math.ceil(1 / (tolerance ** 2 * UNKNOWN)))
+
+
+def fair_seeds(count, start=0, tolerance=0.05, per_stratum=None, workers=None, batch=1000):
+    # Первые count номеров партий от start, где ожидаемые очки первого игрока в пределах 1/2 +- tolerance.
+    # per_stratum по умолчанию - samples_for(tolerance): шум выборки вдвое меньше tolerance.
+    assert isinstance(count, int) and count >= 0 and tolerance > 0
+    per_stratum = per_stratum or samples_for(tolerance)
+    workers = workers or os.cpu_count() or 1
+    found = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=start_worker, initargs=(per_stratum,)) as executor:
+        while len(found) < count:
+            starts = range(start, start + batch * workers, batch)
+            for first, values in zip(starts, executor.map(scores, starts, [batch] * workers)):
+                found.extend(first + n for n, value in enumerate(values) if abs(value - 0.5) <= tolerance)
+            start += batch * workers
+    return found[:count]
+
+
+if __name__ == '__main__':
+    analyzer = Analyzer()
+    for n in range(10):
+        print(n, analyzer.seed(n))
+    print(fair_seeds(20, batch=100))
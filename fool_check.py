@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# Сверка двух реализаций правил на случайных партиях: эталонной и ускоренной.
+# Партия номер n: колода Random(n), ходы обоих игроков выбираются случайно из годных (генератор задан номером).
+# Обе реализации получают одни и те же выборы: номер варианта среди годных ходов (карты по возрастанию номера,
+# затем Пас или Взял). Каждый шаг сверяется целиком: кто ходит, годные карты, можно ли пасовать/взять, ход;
+# в конце - итог партии (GameOver:).
+# Первое расхождение с наименьшим номером партии сокращается до короткого списка ходов: shrink().
+#   python fool_check.py 10000000 game engine  - 10 млн партий Game против fool_engine.Engine на всех ядрах.
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import fool_engine
+import fool_parallel
+import fool_variant
+from card_game_fool import CARDS, Game, GameOver, Policy
+
+MAX_MOVES = 1000  # Случайные игроки могут долго перекладывать карты: дальше партия не сверяется.
+OUTCOMES = {None: None, 'Gamer': 0, 'Dummy': 1}  # GameOver.winner -> победитель.
+
+# Расхождение: номер партии, выборы script (номера вариантов, дальше - нулевые), шаг расхождения,
+# шаги эталона и проверяемой реализации (или итоги партии), ходы до расхождения (названия карт, Пас, Взял).
+Divergence = namedtuple('Divergence', 'seed script step reference candidate moves')
+
+
+class Stop(Exception):  # Партия длиннее MAX_MOVES.
+    pass
+
+
+def numbers(mask):  # Номера карт набора по возрастанию.
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(low.bit_length() - 1)
+        mask ^= low
+    return cards
+
+
+##################
+class Chooser:  # Выбор ходов для runner: случайный (rng) или по списку script. Пишет шаги партии в trace.
+
+    def __init__(self, rng=None, script=()):
+        self.rng = rng
+        self.script = script
+        self.choices = []  # Номера выбранных вариантов.
+        self.trace = []  # Шаги: (игрок, атака ли, годные карты, можно ли Пас/Взял, ход).
+
+    def __call__(self, player, attack, legal, can_pass):  # Ход: номер карты или None (Пас или Взял).
+        step = len(self.trace)
+        if step >= MAX_MOVES:
+            raise Stop
+        options = numbers(legal) + [None] * can_pass
+        if step < len(self.script):
+            choice = self.script[step] % len(options)
+        else:
+            choice = self.rng.randrange(len(options)) if self.rng else 0
+        self.choices.append(choice)
+        self.trace.append((player, attack, legal, can_pass, options[choice]))
+        return options[choice]
+
+
+###############################
+class Scripted(Policy):  # Болван в Game, чьи ходы выбирает Chooser.
+
+    def __init__(self, chooser):
+        self.chooser = chooser
+
+    def choose(self, game):
+        table = game.table
+        attack = table.is_attack()
+        card = self.chooser(1, attack, table.legal_moves(game.hand_dummy.mask), not attack or bool(table.cards))
+        return CARDS[card] if card is not None else None
+
+
+# Runner: (номер партии, chooser) -> победитель (0, 1 или None). Ходы обоих игроков берёт у chooser.
+def run_game(seed, chooser):  # card_game_fool.Game через текстовые команды, как в main.py.
+    game = Game(Random(seed), policy=Scripted(chooser))
+    while True:
+        table = game.table
+        attack = table.is_attack()
+        card = chooser(0, attack, table.legal_moves(game.hand_gamer.mask), not attack or bool(table.cards))
+        event = game.events(str(CARDS[card]) if card is not None else 'Пас' if attack else 'Взял')[-1]
+        if type(event) is GameOver:
+            return OUTCOMES[event.winner]
+
+
+def run_engine(seed, chooser):  # fool_engine.Engine.
+    engine = fool_engine.Engine(fool_engine.deal_order(seed))
+    while not engine.over:
+        attack = engine.count & 1 == 0
+        engine.move(chooser(engine.mover, attack, engine.legal(), not attack or engine.count > 0))
+    return engine.winner
+
+
+def run_variant(seed, chooser):  # fool_variant.VariantEngine по правилам Rules() (совпадают с Game).
+    engine = fool_variant.VariantEngine(fool_variant.deal_order(seed))
+    while not engine.over:
+        attack = engine.last < 0
+        engine.move(chooser(engine.mover, attack, engine.legal(), not attack or engine.count > 0))
+    return None if engine.fool is None else 1 - engine.fool
+
+
+RUNNERS = {'game': run_game, 'engine': run_engine, 'variant': run_variant}
+
+
+def trace(runner, seed, rng=None, script=()):  # Chooser с шагами партии и итог. Исключение реализации - тоже итог.
+    chooser = Chooser(rng, script)
+    try:
+        outcome = 'GameOver:{}'.format(runner(seed, chooser))
+    except Stop:
+        outcome = 'Stop'
+    except Exception as error:  # Недопустимый ход или сбой в реализации.
+        outcome = repr(error)
+    return chooser, outcome
+
+
+def compare(seed, reference, candidate, script=None):  # Первое расхождение партии (Divergence) или None.
+    # Без script ходы случайные: их выбирает эталон, проверяемая реализация получает те же номера вариантов.
+    first, outcome = trace(reference, seed, Random('moves {}'.format(seed)) if script is None else None, script or ())
+    second, other = trace(candidate, seed, None, first.choices)
+    steps = first.trace + [outcome]
+    others = second.trace + [other]
+    for step, (a, b) in enumerate(zip(steps, others)):
+        if a != b:
+            moves = [str(CARDS[card]) if card is not None else 'Пас' if attack else 'Взял'
+                     for _, attack, _, _, card in first.trace[:step]]
+            return Divergence(seed, first.choices[:step + 1], step, a, b, moves)
+    return None
+
+
+def check(start, count, reference=run_game, candidate=run_engine):  # Партии start .. start + count - 1.
+    # (число партий, число расхождений, наименьший номер партии с расхождением или None).
+    failures, first = 0, None
+    for seed in range(start, start + count):
+        if compare(seed, reference, candidate) is not None:
+            failures += 1
+            first = seed if first is None else first
+    return count, failures, first
+
+
+def shrink(found, reference=run_game, candidate=run_engine):  # Короче список выборов с тем же расхождением.
+    # Каждый выбор по очереди пробуем заменить нулевым (младшая годная карта, иначе Пас/Взял).
+    # Выборы после шага расхождения не нужны, нулевые в конце отбрасываются: за концом script выбор нулевой.
+    assert isinstance(found, Divergence)
+    script = list(found.script)
+    n = 0
+    while n < len(script):
+        if script[n]:
+            saved, script[n] = script[n], 0
+            smaller = compare(found.seed, reference, candidate, script)
+            if smaller is None:
+                script[n] = saved
+            else:  # Расхождение то же или раньше: script укорачивается до его шага.
+                found = smaller
+                script = list(found.script)
+        n += 1
+    while script and not script[-1]:
+        script.pop()
+    return found._replace(script=script)
+
+
+def run(n_games, seed=0, reference=run_game, candidate=run_engine, workers=None, batch=10000):
+    # Сверка партий seed .. seed + n_games - 1 на всех ядрах: (число партий, расхождений, Divergence или None).
+    workers = workers or os.cpu_count() or 1
+    jobs = list(fool_parallel.batches(n_games, seed, batch))
+    if workers == 1 or len(jobs) <= 1:
+        results = [check(start, size, reference, candidate) for size, start in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check, [start for _, start in jobs], [size for size, _ in jobs],
+                                        [reference] * len(jobs), [candidate] * len(jobs)))
+    games = sum(result[0] for result in results)
+    failures = sum(result[1] for result in results)
+    firsts = [result[2] for result in results if result[2] is not None]
+    if not firsts:
+        return games, failures, None
+    return games, failures, shrink(compare(min(firsts), reference, candidate), reference, candidate)
+
+
+if __name__ == '__main__':
+    games, failures, found = run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+                                 reference=RUNNERS[sys.argv[2] if len(sys.argv) > 2 else 'game'],
+                                 candidate=RUNNERS[sys.argv[3] if len(sys.argv) > 3 else 'engine'])
+    print('Партий: {}, расхождений: {}'.format(games, failures))
+    if found is not None:
+        print(found)
+    sys.exit(1 if failures else 0)
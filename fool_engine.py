@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+# Партия без текстового протокола: для прогона миллионов партий политика против политики.
+# Правила те же, что в card_game_fool.Game.next_go, но всё состояние - целые числа и битовые маски.
+from collections import Counter, namedtuple
+from random import Random
+
+from card_game_fool import Card, SUIT_MASKS, DIGNITY_MASKS, COVER_MASKS, lowest_card
+
+HAND_SIZE = 6  # До скольких карт добирают руку.
+
+# winner: 0 - победил первый игрок (ходит первым, как игрок в Game), 1 - второй, None - ничья.
+# turns: число ходов (карта, Пас или Взял). taken: сколько карт каждый игрок взял со стола.
+Result = namedtuple('Result', 'winner turns taken')
+
+# Неизменяемый снимок позиции Engine. order - ссылка на колоду партии, она не меняется и не копируется.
+GameState = namedtuple('GameState', 'order trump hand0 hand1 size0 size1 table dignities last count cursor '
+                                    'mover turns taken0 taken1 over winner')
+
+
+def deal_order(seed):  # Порядок колоды для номера партии. order[0] - козырная карта, берут с конца.
+    # Тасовка та же, что в Deck(Random(seed)): партию можно повторить и в Game(Random(seed)).
+    order = list(range(Card.len()))
+    Random(seed).shuffle(order)
+    return order
+
+
+#############################################
+class Engine:  # Состояние партии целыми числами.
+
+    __slots__ = ('order', 'cursor', 'trump', 'hands', 'sizes', 'table', 'dignities', 'last', 'count',
+                 'mover', 'turns', 'taken', 'over', 'winner', 'undo')
+
+    def __init__(self, order):
+        assert len(order) == Card.len()
+        self.order = order  # Колода: order[0] - козырная карта, берут с конца.
+        self.cursor = len(order)  # Сколько карт осталось в колоде.
+        self.trump = order[0] & 3  # Козырная масть.
+        self.hands = [0, 0]  # Руки игроков битовыми масками.
+        self.sizes = [0, 0]  # Число карт в руках.
+        self.table = 0  # Карты на столе.
+        self.dignities = 0  # Все карты достоинств, лежащих на столе.
+        self.last = -1  # Последняя карта на столе.
+        self.count = 0  # Число карт на столе. Четное - атака, нечетное - защита.
+        self.mover = 0  # Чей ход. Первым ходит игрок 0.
+        self.turns = 0
+        self.taken = [0, 0]
+        self.over = False
+        self.winner = None
+        self.undo = []  # Поля позиций до ходов make() подряд, по 13 чисел на ход (см. make).
+        self.deal(0)
+
+    @staticmethod
+    def from_game(game, mover=0):  # Позиция партии Game. Игрок 0 - игрок, 1 - Болван; mover - чей ход.
+        engine = object.__new__(Engine)
+        engine.order = [card.id() for card in game.deck.cards()]
+        engine.cursor = len(engine.order)
+        engine.trump = game.table.trump_suit().value()
+        engine.hands = [game.hand_gamer.mask, game.hand_dummy.mask]
+        engine.sizes = [game.hand_gamer.len(), game.hand_dummy.len()]
+        engine.table = game.table.mask
+        engine.dignities = game.table.dignities
+        engine.last = game.table.cards[-1].id() if game.table.cards else -1
+        engine.count = game.table.len()
+        engine.mover = mover
+        engine.turns = 0
+        engine.taken = [0, 0]
+        engine.over = False
+        engine.winner = None
+        engine.undo = []
+        return engine
+
+    def copy(self):
+        engine = object.__new__(Engine)
+        for name in Engine.__slots__:
+            setattr(engine, name, getattr(self, name))
+        engine.hands = self.hands[:]
+        engine.sizes = self.sizes[:]
+        engine.taken = self.taken[:]
+        engine.undo = []
+        return engine
+
+    def state(self):  # Снимок позиции: один кортеж, без копирования колоды.
+        return GameState(self.order, self.trump, self.hands[0], self.hands[1], self.sizes[0], self.sizes[1],
+                         self.table, self.dignities, self.last, self.count, self.cursor, self.mover, self.turns,
+                         self.taken[0], self.taken[1], self.over, self.winner)
+
+    def restore(self, state):  # Вернуться к снимку state().
+        (self.order, self.trump, self.hands[0], self.hands[1], self.sizes[0], self.sizes[1], self.table,
+         self.dignities, self.last, self.count, self.cursor, self.mover, self.turns,
+         self.taken[0], self.taken[1], self.over, self.winner) = state
+
+    @staticmethod
+    def from_state(state):  # Новая партия из снимка.
+        assert isinstance(state, GameState)
+        engine = object.__new__(Engine)
+        engine.hands = [0, 0]
+        engine.sizes = [0, 0]
+        engine.taken = [0, 0]
+        engine.undo = []
+        engine.restore(state)
+        return engine
+
+    def make(self, card):  # Ход, который можно отменить через unmake().
+        # Поля, которые может изменить ход, кладутся в плоский список undo: без кортежа на каждый ход.
+        # order и trump ход не меняет, over и winner до хода - False и None.
+        assert not self.over
+        undo = self.undo
+        undo += self.hands
+        undo += self.sizes
+        undo += self.taken
+        undo.append(self.table)
+        undo.append(self.dignities)
+        undo.append(self.last)
+        undo.append(self.count)
+        undo.append(self.cursor)
+        undo.append(self.mover)
+        undo.append(self.turns)
+        self.move(card)
+
+    def unmake(self):  # Отменить последний ход make().
+        undo = self.undo
+        self.turns = undo.pop()
+        self.mover = undo.pop()
+        self.cursor = undo.pop()
+        self.count = undo.pop()
+        self.last = undo.pop()
+        self.dignities = undo.pop()
+        self.table = undo.pop()
+        self.taken[1] = undo.pop()
+        self.taken[0] = undo.pop()
+        self.sizes[1] = undo.pop()
+        self.sizes[0] = undo.pop()
+        self.hands[1] = undo.pop()
+        self.hands[0] = undo.pop()
+        self.over = False
+        self.winner = None
+
+    def deal(self, first):  # Раздача до 6 карт по одной, начиная с first.
+        order, hands, sizes = self.order, self.hands, self.sizes
+        second = 1 - first
+        while self.cursor:
+            dealt = False
+            for player in first, second:
+                if self.cursor and sizes[player] < HAND_SIZE:
+                    self.cursor -= 1
+                    hands[player] |= 1 << order[self.cursor]
+                    sizes[player] += 1
+                    dealt = True
+            if not dealt:  # Если карты уже не берут.
+                break
+
+    def legal(self):  # Маска карт, которыми может ходить mover.
+        hand = self.hands[self.mover]
+        if self.count == 0:  # Первый ход любая карта.
+            return hand
+        if self.count & 1:  # Защита.
+            return hand & COVER_MASKS[self.trump][self.last]
+        return hand & self.dignities  # Подкидывать только уже присутствующего достоинства.
+
+    def clear(self):  # Очистить стол.
+        self.table = 0
+        self.dignities = 0
+        self.last = -1
+        self.count = 0
+
+    def move(self, card):  # Ход игрока mover: номер карты или None (Пас при атаке, Взял при защите).
+        mover = self.mover
+        attack = self.count & 1 == 0  # Атакует ли mover.
+        self.turns += 1
+        ticket = False  # Право внеочередного хода.
+
+        if card is not None:  # Ход картой.
+            bit = 1 << card
+            assert self.legal() & bit
+            self.hands[mover] ^= bit
+            self.sizes[mover] -= 1
+            self.table |= bit
+            self.dignities |= DIGNITY_MASKS[card >> 2]
+            self.last = card
+            self.count += 1
+            if attack or (self.sizes[0] and self.sizes[1]):  # Кон продолжается.
+                self.mover = 1 - mover
+                return
+            ticket = True  # Отбился, и у кого-то кончились карты. Теперь ходит первым.
+        elif attack:  # Пас.
+            assert self.count > 0 or self.legal() == 0  # Первым ходом пасовать нельзя.
+            self.clear()
+        else:  # Взял. Все карты со стола ему в руку.
+            self.hands[mover] |= self.table
+            self.sizes[mover] += self.count
+            self.taken[mover] += self.count
+            self.clear()
+
+        if self.cursor == 0:  # Колода пуста.
+            if not attack and not (self.sizes[0] and self.sizes[1]):  # У кого-то кончились карты.
+                self.over = True
+                if self.sizes[0] == self.sizes[1]:  # Ничья: обе руки пусты.
+                    self.winner = None
+                else:
+                    self.winner = 0 if self.sizes[0] == 0 else 1
+                return
+        else:
+            self.deal(1 - mover if ticket else mover)  # Начинаем с того кто сейчас ходил.
+
+        if not ticket:
+            self.mover = 1 - mover
+
+    def result(self):
+        assert self.over
+        return Result(self.winner, self.turns, tuple(self.taken))
+
+
+def dummy(engine, legal):  # Политика Game.dummy: младшая годная карта, козыри в последнюю очередь.
+    moves = legal & ~SUIT_MASKS[engine.trump] or legal
+    return lowest_card(moves) if moves else None
+
+
+def play(seed, policy_a=dummy, policy_b=dummy):  # Сыграть партию. policy(engine, legal) -> карта или None.
+    engine = Engine(deal_order(seed))
+    policies = policy_a, policy_b
+    while not engine.over:
+        engine.move(policies[engine.mover](engine, engine.legal()))
+    return engine.result()
+
+
+#########################
+class Stats:  # Сводка по множеству партий.
+
+    def __init__(self):
+        self.games = 0
+        self.wins = [0, 0]  # Победы первого и второго игрока.
+        self.draws = 0
+        self.turns = 0  # Сумма длин партий.
+        self.taken = [0, 0]  # Сколько всего карт взял со стола каждый игрок.
+        self.lengths = Counter()  # Число партий каждой длины.
+
+    def add(self, result):
+        assert isinstance(result, Result)
+        self.games += 1
+        if result.winner is None:
+            self.draws += 1
+        else:
+            self.wins[result.winner] += 1
+        self.turns += result.turns
+        self.taken[0] += result.taken[0]
+        self.taken[1] += result.taken[1]
+        self.lengths[result.turns] += 1
+
+    def merge(self, other):  # Добавить сводку другой пачки партий. Порядок слияния не важен.
+        assert isinstance(other, Stats)
+        self.games += other.games
+        self.wins = [a + b for a, b in zip(self.wins, other.wins)]
+        self.draws += other.draws
+        self.turns += other.turns
+        self.taken = [a + b for a, b in zip(self.taken, other.taken)]
+        self.lengths.update(other.lengths)
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, Stats) and vars(self) == vars(other)
+
+    def win_rates(self):  # Доли побед первого и второго игрока.
+        return tuple(wins / self.games for wins in self.wins) if self.games else (0.0, 0.0)
+
+    def mean_turns(self):
+        return self.turns / self.games if self.games else 0.0
+
+    def __repr__(self):
+        return 'Stats(games={}, wins={}, draws={}, mean_turns={:.2f})'.format(
+            self.games, self.wins, self.draws, self.mean_turns())
+
+
+def simulate(n_games, seed=0, policy_a=dummy, policy_b=dummy):  # Партии с номерами seed .. seed + n_games - 1.
+    assert isinstance(n_games, int) and n_games >= 0
+    stats = Stats()
+    for n in range(seed, seed + n_games):
+        stats.add(play(n, policy_a, policy_b))
+    return stats
+
+
+if __name__ == '__main__':
+    print(simulate(10000))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# Признаки позиции для обученного Болвана (нужен NumPy) и пакетный выбор хода линейной моделью или MLP.
+# Позиция - глазами Болвана: строка из SIZE чисел float32, раскладка - константы ниже.
+# Много партий кодируются в одну заранее выделенную матрицу Encoder, ходы всех партий оцениваются
+# одним умножением матриц на слой: 36 столбцов - карты, столбец PASS - Пас или Взял.
+import numpy as np
+
+from card_game_fool import Card, Policy
+
+HAND = 0  # Рука Болвана: 36 бит.
+TABLE = HAND + Card.len()  # Карты на столе: 36 бит.
+BEAT = TABLE + Card.len()  # Карта, которую нужно побить (при атаке нули): 36 бит.
+KNOWN = BEAT + Card.len()  # Известные Болвану карты игрока (Game.knowledge): 36 бит.
+TRUMP = KNOWN + Card.len()  # Козырная масть: 4 числа, одно из них 1.
+DECK = TRUMP + 4  # Карт в колоде / 36.
+OPPONENT = DECK + 1  # Карт у игрока / 36.
+ATTACK = OPPONENT + 1  # 1 при атаке, 0 при защите.
+SIZE = ATTACK + 1
+
+PASS = Card.len()  # Столбец оценки Паса (Взял).
+MOVES = Card.len() + 1  # Столбцов в оценках.
+
+_MASKS = 4  # Маски на позицию: рука, стол, карта для защиты, известные карты. Идут подряд с HAND.
+_SHIFTS = np.arange(Card.len(), dtype=np.int64)
+
+
+##############################
+class Encoder:  # Заранее выделенные массивы на capacity позиций: кодирование без выделений памяти на позицию.
+
+    def __init__(self, capacity=1024):
+        assert capacity > 0
+        self.capacity = capacity
+        self.masks = np.zeros((capacity, _MASKS + 1), dtype=np.int64)  # Маски признаков и годные карты.
+        self.bits = np.zeros((capacity, _MASKS + 1, Card.len()), dtype=np.int64)
+        self.features = np.zeros((capacity, SIZE), dtype=np.float32)
+        self.legal = np.zeros((capacity, MOVES), dtype=bool)
+
+    def encode(self, games):  # Признаки и годные ходы партий: (features, legal) - виды на первые строки.
+        n = len(games)
+        assert n <= self.capacity, 'Партий больше, чем строк в Encoder'
+        masks, features, legal = self.masks, self.features, self.legal
+        features[:n, TRUMP:] = 0
+        for row, game in enumerate(games):
+            table = game.table
+            attack = table.is_attack()
+            hand = game.hand_dummy.mask
+            masks[row, 0] = hand
+            masks[row, 1] = table.mask
+            masks[row, 2] = 0 if attack else 1 << table.cards[-1].id()
+            masks[row, 3] = game.knowledge.known[0]
+            masks[row, 4] = moves = table.legal_moves(hand)
+            legal[row, PASS] = bool(table.cards) or not moves  # Первым ходом пасовать нельзя.
+            features[row, TRUMP + table.trump_suit().value()] = 1
+            features[row, DECK] = game.deck.len() / Card.len()
+            features[row, OPPONENT] = game.hand_gamer.len() / Card.len()
+            features[row, ATTACK] = attack
+        bits = self.bits[:n]
+        np.right_shift(masks[:n, :, None], _SHIFTS, out=bits)
+        np.bitwise_and(bits, 1, out=bits)
+        features[:n, HAND:TRUMP] = bits[:, :_MASKS].reshape(n, _MASKS * Card.len())
+        legal[:n, :PASS] = bits[:, _MASKS]
+        return features[:n], legal[:n]
+
+
+############################
+class Model:  # Линейная модель или MLP: слои (W, b), между ними ReLU. Выход - MOVES оценок.
+
+    def __init__(self, layers):
+        assert layers and layers[0][0].shape[0] == SIZE and layers[-1][0].shape[1] == MOVES
+        self.layers = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in layers]
+
+    @staticmethod
+    def load(path):  # Веса из .npz: w0, b0, w1, b1, ...
+        with np.load(path) as data:
+            return Model([(data['w{}'.format(n)], data['b{}'.format(n)]) for n in range(len(data.files) // 2)])
+
+    def save(self, path):
+        np.savez(path, **{'{}{}'.format(name, n): array
+                          for n, layer in enumerate(self.layers) for name, array in zip('wb', layer)})
+
+    @staticmethod
+    def random(hidden=(), seed=0):  # Случайные веса: hidden - размеры скрытых слоёв, () - линейная модель.
+        rng = np.random.default_rng(seed)
+        sizes = (SIZE,) + tuple(hidden) + (MOVES,)
+        return Model([(rng.normal(0, 1 / np.sqrt(m), (m, n)), np.zeros(n)) for m, n in zip(sizes, sizes[1:])])
+
+    def scores(self, features):  # Оценки ходов для каждой строки признаков.
+        x = features
+        for n, (w, b) in enumerate(self.layers):
+            x = x @ w
+            x += b
+            if n + 1 < len(self.layers):
+                np.maximum(x, 0, out=x)
+        return x
+
+
+def choose(model, games, encoder=None):  # Ходы Болвана во всех партиях: карта или None (Пас, Взял).
+    encoder = encoder or Encoder(len(games))
+    features, legal = encoder.encode(games)
+    scores = model.scores(features)
+    scores[~legal] = -np.inf
+    return [Card.by_id(move) if move != PASS else None for move in scores.argmax(axis=1).tolist()]
+
+
+###############################
+class Learned(Policy):  # Болван с обученной моделью. Для многих партий сразу - choose().
+
+    def __init__(self, model, encoder=None):
+        assert isinstance(model, Model)
+        self.model = model
+        self.encoder = encoder or Encoder(1)
+
+    def choose(self, game):
+        return choose(self.model, [game], self.encoder)[0]
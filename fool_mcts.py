@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Болван на поиске Монте-Карло по информационным множествам (ISMCTS).
+# Скрытые карты (рука игрока, кроме виденных Болваном, и колода, кроме козырной) на каждой итерации раздаются заново,
+# партия доигрывается политикой fool_engine.dummy. Дерево переиспользуется между ходами.
+import math
+import time
+from random import Random
+
+import fool_engine
+from card_game_fool import Card, Policy
+
+PASS = -1  # Ход не картой: Пас при атаке, Взял при защите.
+
+
+def actions(engine):  # Ходы mover: номера годных карт и PASS, если можно пасовать или взять.
+    legal = engine.legal()
+    moves = []
+    mask = legal
+    while mask:
+        low = mask & -mask
+        moves.append(low.bit_length() - 1)
+        mask ^= low
+    if engine.count or not legal:  # Первым ходом пасовать нельзя.
+        moves.append(PASS)
+    return moves
+
+
+def determinize(engine, observer, rng, known=0):  # Копия позиции, где скрытые от observer карты розданы случайно.
+    # known - карты соперника, которые observer видел (Knowledge.known): они остаются у соперника.
+    engine = engine.copy()
+    other = 1 - observer
+    known &= engine.hands[other]
+    hidden = list(engine.order[1:engine.cursor]) if engine.cursor else []  # Козырная карта видна.
+    mask = engine.hands[other] & ~known
+    while mask:
+        low = mask & -mask
+        hidden.append(low.bit_length() - 1)
+        mask ^= low
+    rng.shuffle(hidden)
+    size = engine.sizes[other] - bin(known).count('1')
+    engine.hands[other] = known | sum(1 << card for card in hidden[:size])
+    if engine.cursor:
+        engine.order = engine.order[:1] + hidden[size:]
+    return engine
+
+
+###########
+class Node:  # Узел дерева: ход, который к нему привёл, и статистика.
+
+    __slots__ = 'player', 'children', 'visits', 'reward', 'available'
+
+    def __init__(self, player):
+        self.player = player  # Кто сделал ход в этот узел.
+        self.children = {}  # Ход -> узел.
+        self.visits = 0
+        self.reward = 0.0  # Сумма выигрышей player: 1 победа, 0.5 ничья.
+        self.available = 0  # Сколько раз ход был возможен при выборе (для ISMCTS).
+
+    def ucb(self, exploration):
+        return self.reward / self.visits + exploration * math.sqrt(math.log(self.available) / self.visits)
+
+
+##################################
+class ISMCTS(Policy):  # Стратегия Болвана в Game.
+
+    def __init__(self, budget=0.05, iterations=None, exploration=0.7, rng=None):
+        assert budget or iterations  # Время на ход в секундах и/или число итераций.
+        self.budget = budget
+        self.iterations = iterations
+        self.exploration = exploration
+        self.rng = rng or Random()
+        self.root = None  # Дерево с прошлого хода, уже спущенное по сделанным ходам.
+        self.known = 0  # Карты соперника, которые видел Болван (из Game.knowledge).
+
+    def observe(self, game, gamer, card):  # Спуститься по дереву вслед за сделанным ходом.
+        if self.root is not None:
+            self.root = self.root.children.get(PASS if card is None else card.id())
+
+    def choose(self, game):
+        engine = fool_engine.Engine.from_game(game, mover=1)
+        self.known = game.knowledge.known[0]
+        move = self.search(engine)
+        return None if move == PASS else Card.by_id(move)
+
+    def search(self, engine):  # Лучший ход mover в позиции engine.
+        moves = actions(engine)
+        if len(moves) == 1:
+            return moves[0]
+        root = self.root if self.root is not None else Node(1 - engine.mover)
+        deadline = time.perf_counter() + self.budget if self.budget else None
+        iteration = 0
+        while (self.iterations is None or iteration < self.iterations) and \
+                (deadline is None or time.perf_counter() < deadline):
+            self.iterate(root, determinize(engine, engine.mover, self.rng, self.known))
+            iteration += 1
+        self.root = root
+        return max(moves, key=lambda move: root.children[move].visits if move in root.children else -1)
+
+    def iterate(self, root, engine):  # Одна итерация: выбор, расширение, доигрывание, обновление.
+        node, path = root, [root]
+        while not engine.over:
+            moves = actions(engine)
+            untried = [move for move in moves if move not in node.children]
+            for move in moves:
+                if move in node.children:
+                    node.children[move].available += 1
+            if untried:  # Расширение.
+                move = self.rng.choice(untried)
+                child = node.children[move] = Node(engine.mover)
+                child.available = 1
+                engine.move(None if move == PASS else move)
+                path.append(child)
+                break
+            move = max(moves, key=lambda move: node.children[move].ucb(self.exploration))
+            node = node.children[move]
+            engine.move(None if move == PASS else move)
+            path.append(node)
+
+        while not engine.over:  # Доигрывание.
+            engine.move(fool_engine.dummy(engine, engine.legal()))
+
+        for node in path:
+            node.visits += 1
+            if engine.winner is None:
+                node.reward += 0.5
+            elif engine.winner == node.player:
+                node.reward += 1.0
+
+
+def policy(budget=0.05, iterations=None, rng=None):  # Стратегия для fool_engine.play: (engine, legal) -> ход.
+    ismcts = ISMCTS(budget, iterations, rng=rng)
+
+    def choose(engine, legal):
+        ismcts.root = None  # В fool_engine нет observe: дерево не переносится.
+        move = ismcts.search(engine)
+        return None if move == PASS else move
+    return choose
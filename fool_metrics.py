@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Счётчики и гистограммы задержек для Game(metrics=Metrics()).
+# Выключенные метрики (metrics=None) стоят одной проверки на None в горячих местах.
+# Один объект Metrics можно отдать многим партиям: тогда он считает по всем сразу.
+from bisect import bisect_left
+
+# Верхние границы корзин гистограммы в секундах: от 1 мкс до ~8 с, каждая вдвое больше предыдущей.
+BUCKETS = tuple(1e-6 * 2 ** n for n in range(24))
+
+
+#####################
+class Histogram:  # Гистограмма задержек с корзинами BUCKETS.
+
+    __slots__ = 'counts', 'count', 'sum'
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Последняя корзина - всё, что дольше BUCKETS[-1].
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):  # Оценка квантиля по верхней границе корзины (None, если замеров нет).
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bucket, count in enumerate(self.counts):
+            total += count
+            if total >= rank and count:
+                return BUCKETS[bucket] if bucket < len(BUCKETS) else float('inf')
+        return float('inf')
+
+
+###################
+class Metrics:  # Счётчики и гистограммы по имени и метке.
+
+    def __init__(self):
+        self.counters = {}  # (имя, метка) -> число.
+        self.histograms = {}  # (имя, метка) -> Histogram.
+
+    def count(self, name, label='', n=1):
+        key = name, label
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name, label, seconds):
+        key = name, label
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def stats(self):  # Сводка: счётчики и задержки (число, сумма, p50, p99).
+        return {
+            'counters': {'{}:{}'.format(*key) if key[1] else key[0]: value
+                         for key, value in sorted(self.counters.items())},
+            'latency': {'{}:{}'.format(*key) if key[1] else key[0]: {
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            } for key, histogram in sorted(self.histograms.items())},
+        }
+
+    def prometheus(self, prefix='fool'):  # Текст в формате Prometheus.
+        lines = []
+        for name in sorted({key[0] for key in self.counters}):
+            lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+            for (counter, label), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append('{}_{}_total{} {}'.format(prefix, name, labels(label), value))
+        for name in sorted({key[0] for key in self.histograms}):
+            lines.append('# TYPE {}_{}_seconds histogram'.format(prefix, name))
+            for (histogram_name, label), histogram in sorted(self.histograms.items()):
+                if histogram_name != name:
+                    continue
+                total = 0
+                for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                    total += count
+                    lines.append('{}_{}_seconds_bucket{} {}'.format(
+                        prefix, name, labels(label, '+Inf' if bound == float('inf') else repr(bound)), total))
+                lines.append('{}_{}_seconds_sum{} {!r}'.format(prefix, name, labels(label), histogram.sum))
+                lines.append('{}_{}_seconds_count{} {}'.format(prefix, name, labels(label), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+def labels(label, le=None):  # {kind="...",le="..."} для строки Prometheus.
+    pairs = []
+    if label:
+        pairs.append('kind="{}"'.format(label.replace('\\', '\\\\').replace('"', '\\"')))
+    if le is not None:
+        pairs.append('le="{}"'.format(le))
+    return '{' + ','.join(pairs) + '}' if pairs else ''
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Параллельный прогон партий на всех ядрах.
+# Партия номер n всегда тасуется генератором Random(n), поэтому итог не зависит от числа процессов
+# и от того, как партии разбиты на пачки. Любую партию можно повторить: replay(n) или Game(Random(n)).
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import fool_engine
+
+
+def batches(n_games, seed, batch):  # Пачки (число партий, номер первой партии).
+    for start in range(seed, seed + n_games, batch):
+        yield min(batch, seed + n_games - start), start
+
+
+def run(n_games, seed=0, workers=None, batch=10000, policy_a=fool_engine.dummy, policy_b=fool_engine.dummy):
+    # Партии с номерами seed .. seed + n_games - 1. Политики должны быть функциями уровня модуля (pickle).
+    assert isinstance(n_games, int) and n_games >= 0
+    assert isinstance(batch, int) and batch > 0
+    workers = workers or os.cpu_count() or 1
+    stats = fool_engine.Stats()
+    jobs = list(batches(n_games, seed, batch))
+
+    if workers == 1 or len(jobs) <= 1:  # Пул процессов не нужен.
+        for count, start in jobs:
+            stats.merge(fool_engine.simulate(count, start, policy_a, policy_b))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fool_engine.simulate, count, start, policy_a, policy_b) for count, start in jobs]
+        for future in futures:  # Сливаем в порядке пачек.
+            stats.merge(future.result())
+    return stats
+
+
+def replay(n, policy_a=fool_engine.dummy, policy_b=fool_engine.dummy):  # Повторить одну партию по её номеру.
+    return fool_engine.play(n, policy_a, policy_b)
+
+
+if __name__ == '__main__':
+    print(run(100000))
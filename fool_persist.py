@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Снимки всех партий сервера в файл и восстановление при запуске.
+# snapshot() пишет снимок в новый файл и подменяет им старый (os.replace): файл не растёт, в нём один снимок.
+# append() дописывает снимок в конец файла. Файл - последовательность снимков.
+# Снимок: MAGIC, длина и CRC32 содержимого (по 4 байта), содержимое:
+# число партий (4 байта), затем для каждой - длина и байты sid, длина и байты Game.dumps().
+# Действует последний целый снимок: оборванная при падении запись в конце файла пропускается.
+import mmap
+import os
+import struct
+import zlib
+
+from card_game_fool import Game
+
+MAGIC = b'FSNP'
+_HEADER = struct.Struct('<4sII')  # MAGIC, длина содержимого, CRC32.
+_COUNT = struct.Struct('<I')
+
+
+def entry(sid, game):  # Запись одной партии в снимке: длина и байты sid, длина и байты Game.dumps().
+    sid, state = sid.encode('utf-8'), game.dumps()
+    return bytes((len(sid),)) + sid + bytes((len(state),)) + state
+
+
+def join(entries):  # Содержимое снимка из записей entry().
+    return _COUNT.pack(len(entries)) + b''.join(entries)
+
+
+def pack(sessions):  # Содержимое снимка из пар (sid, game).
+    return join([entry(sid, game) for sid, game in sessions])
+
+
+def unpack(payload):  # Пары (sid, байты позиции) из содержимого снимка.
+    count, = _COUNT.unpack_from(payload)
+    position = _COUNT.size
+    for _ in range(count):
+        size = payload[position]
+        sid = bytes(payload[position + 1:position + 1 + size]).decode('utf-8')
+        position += 1 + size
+        size = payload[position]
+        yield sid, bytes(payload[position + 1:position + 1 + size])
+        position += 1 + size
+
+
+def write(path, payload, mode):  # Записать снимок с содержимым payload и дождаться диска. Вернёт размер в байтах.
+    with open(path, mode) as file:
+        file.write(_HEADER.pack(MAGIC, len(payload), zlib.crc32(payload)) + payload)
+        file.flush()
+        os.fsync(file.fileno())
+    return _HEADER.size + len(payload)
+
+
+def replace(path, payload):  # Файл path с единственным снимком payload: запись во временный файл и замена.
+    # При падении посреди записи остаётся прежний файл целиком.
+    temporary = path + '.tmp'
+    size = write(temporary, payload, 'wb')
+    os.replace(temporary, path)
+    return size
+
+
+def snapshot(path, sessions):  # Заменить файл снимком партий (sid, game). Вернёт его размер в байтах.
+    return replace(path, pack(sessions))
+
+
+def append(path, sessions):  # Дописать снимок партий (sid, game) в конец файла. Вернёт его размер в байтах.
+    return write(path, pack(sessions), 'ab')
+
+
+def last(path):  # Содержимое последнего целого снимка или None. Файл отображается в память.
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        found = None
+        position, size = 0, len(data)
+        while position + _HEADER.size <= size:
+            magic, length, crc = _HEADER.unpack_from(data, position)
+            end = position + _HEADER.size + length
+            if magic != MAGIC or end > size:  # Оборванная запись.
+                break
+            if zlib.crc32(data[position + _HEADER.size:end]) == crc:
+                found = position + _HEADER.size, end
+            position = end
+        return data[found[0]:found[1]] if found else None
+
+
+def restore(path, policy_factory=None):  # Партии последнего снимка: {sid: Game}. Пустой словарь, если снимков нет.
+    payload = last(path)
+    if payload is None:
+        return {}
+    return {sid: Game.loads(state, policy_factory() if policy_factory else None) for sid, state in unpack(payload)}
+
+
+def compact(path):  # Оставить в файле только последний снимок (запись во временный файл и замена).
+    payload = last(path)
+    if payload is not None:
+        replace(path, payload)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Двоичная запись партий.
+# Запись одной партии: 36 байт колоды (номера карт, первый - козырная, берут с конца),
+# затем по байту на ход: номер карты 0..35, PASS или TAKE, и в конце END.
+# Ходы игрока и Болвана идут вперемешку в порядке игры: кто ходил, однозначно следует из правил.
+import mmap
+from collections import namedtuple
+
+from card_game_fool import Card, Deck, Game, Policy
+
+PASS = 36  # Пас.
+TAKE = 37  # Взял.
+END = 255  # Конец записи партии.
+
+Record = namedtuple('Record', 'order actions')  # Колода и ходы - bytes.
+
+
+class EndOfRecord(Exception):  # Запись кончилась на ходе Болвана.
+    pass
+
+
+#################################
+class Recorder:  # Пишет партии Game(recorder=...) в двоичный поток.
+
+    def __init__(self, stream):
+        self.stream = stream  # Файл, открытый на запись в двоичном режиме.
+        self.buffer = None  # Запись текущей партии.
+
+    def start(self, cards):  # Новая партия: колода до раздачи.
+        self.finish()
+        assert len(cards) == Card.len()
+        self.buffer = bytearray(card.id() for card in cards)
+
+    def action(self, card, attack):  # Ход: карта или None (Пас при атаке, Взял при защите).
+        if self.buffer is not None:
+            self.buffer.append(card.id() if card is not None else PASS if attack else TAKE)
+
+    def finish(self):  # Партия окончена (или брошена): дописать её в поток.
+        if self.buffer is not None:
+            self.buffer.append(END)
+            self.stream.write(self.buffer)
+            self.buffer = None
+
+    def close(self):
+        self.finish()
+        self.stream.flush()
+
+
+def write(stream, order, actions):  # Записать готовую партию: номера карт колоды и коды ходов.
+    assert len(order) == Card.len()
+    stream.write(bytes(order) + bytes(actions) + bytes((END,)))
+
+
+def records(path):  # Все партии файла по очереди. Файл отображается в память, а не читается целиком.
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:  # Пустой файл нельзя отобразить.
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position, size = 0, len(data)
+            while position < size:
+                end = data.find(bytes((END,)), position + Card.len())
+                if end == -1:  # Оборванная последняя запись.
+                    end = size
+                yield Record(data[position:position + Card.len()], data[position + Card.len():end])
+                position = end + 1
+
+
+###################################
+class Replay(Policy):  # Болван, который повторяет записанные ходы.
+
+    def __init__(self, actions):
+        self.actions = actions  # Общий с replay() итератор ходов.
+
+    def choose(self, game):
+        code = next(self.actions, None)
+        if code is None:
+            raise EndOfRecord
+        return Card.by_id(code) if code < PASS else None
+
+
+def replay(record, moves=None):  # Партия Game в позиции после первых moves ходов записи (по умолчанию всех).
+    assert isinstance(record, Record)
+    actions = iter(record.actions[:moves] if moves is not None else record.actions)
+    game = Game(policy=Replay(actions), deck=Deck(order=[Card.by_id(n) for n in record.order]))
+    try:
+        for code in actions:  # Ходы игрока. Ходы Болвана забирает из того же итератора Replay.
+            if code < PASS:
+                game.command(str(Card.by_id(code)))
+            else:
+                game.command('Пас' if code == PASS else 'Взял')
+    except EndOfRecord:  # Позиция перед ходом Болвана.
+        pass
+    return game
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# Сервер на asyncio: тысячи партий в одном процессе.
+# Протокол строковый, UTF-8. Запрос - одна строка:
+#   НОВАЯ                  - начать партию, в ответе её номер (sid);
+#   <sid> <команда>        - команда партии, как в main.py (Рука, Пас, Дама-пики, Выход ...).
+# Ответ: строка "OK <sid>" или "ERR <причина>", затем текст ответа Game.command, затем строка ".".
+# Строки текста, начинающиеся с ".", передаются с лишней точкой в начале (как в SMTP).
+#   python fool_server.py 8888 sessions.snap  - партии переживают перезапуск сервера (см. fool_persist).
+import asyncio
+import secrets
+import sys
+import time
+
+import card_game_fool as fool
+import fool_persist
+
+NEW = 'НОВАЯ'
+EXIT = 'Выход'
+
+
+class Session:  # Партия и время последнего обращения к ней.
+
+    __slots__ = 'sid', 'game', 'used'
+
+    def __init__(self, sid, game):
+        self.sid = sid
+        self.game = game
+        self.used = time.monotonic()
+
+
+###########################################
+class SessionPool:  # Все партии сервера по номерам.
+
+    def __init__(self, max_sessions=10000, idle_timeout=600.0, game_factory=fool.Game):
+        assert max_sessions > 0 and idle_timeout > 0
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout  # Через сколько секунд без команд партия удаляется.
+        self.game_factory = game_factory
+        self.sessions = {}
+        self.writing = None  # Запись снимка в потоке (asyncio.Future) или None.
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def new(self):  # Новая партия или None, если мест нет даже после удаления простаивающих.
+        if len(self.sessions) >= self.max_sessions:
+            self.evict()
+            if len(self.sessions) >= self.max_sessions:
+                return None
+        sid = secrets.token_hex(8)
+        session = self.sessions[sid] = Session(sid, self.game_factory())
+        return session
+
+    def get(self, sid):
+        session = self.sessions.get(sid)
+        if session is not None:
+            session.used = time.monotonic()
+        return session
+
+    def close(self, sid):
+        self.sessions.pop(sid, None)
+
+    def evict(self):  # Удалить простаивающие партии. Вернёт их число.
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [sid for sid, session in self.sessions.items() if session.used < deadline]
+        for sid in idle:
+            del self.sessions[sid]
+        return len(idle)
+
+    async def collect(self, chunk=100):  # Содержимое снимка всех партий (fool_persist.join). Каждые chunk партий
+        # цикл событий свободен: 10000 партий - это около 100 мс Game.dumps().
+        entries = []
+        for n, sid in enumerate(list(self.sessions)):
+            session = self.sessions.get(sid)
+            if session is not None:  # Партия могла закончиться, пока собирались другие.
+                entries.append(fool_persist.entry(sid, session.game))
+            if n % chunk == chunk - 1:
+                await asyncio.sleep(0)
+        return fool_persist.join(entries)
+
+    def snapshot(self, path):  # Снимок всех партий в файл path вместо прежнего (см. fool_persist).
+        return fool_persist.snapshot(path, ((sid, session.game) for sid, session in self.sessions.items()))
+
+    def restore(self, path):  # Партии из последнего снимка. Вернёт их число.
+        for sid, game in fool_persist.restore(path).items():
+            self.sessions[sid] = Session(sid, game)
+        return len(self.sessions)
+
+    async def snapshot_forever(self, path, interval=60.0):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            # Содержимое собирается в цикле событий частями (каждая партия - целиком, между командами). Запись, fsync
+            # и замена файла - в потоке: соединения не ждут ни всех Game.dumps() разом, ни диска.
+            payload = await self.collect()
+            self.writing = loop.run_in_executor(None, fool_persist.replace, path, payload)
+            await asyncio.shield(self.writing)  # Отмена задачи не обрывает запись: её дождётся serve().
+
+    async def evict_forever(self, interval=30.0):
+        while True:
+            await asyncio.sleep(interval)
+            self.evict()
+
+    def execute(self, line):  # Ответ на строку запроса: (заголовок, текст).
+        if line == NEW:
+            session = self.new()
+            if session is None:
+                return 'ERR Слишком много партий', ''
+            game = session.game
+            text = game.hello() + game.command_commands()
+            text += 'Козырь: ' + game.command_trump() + 'Рука: ' + game.command_hand()
+            return 'OK ' + session.sid, text
+
+        sid, _, command = line.partition(' ')
+        session = self.get(sid)
+        if session is None:
+            return 'ERR Нет такой партии', ''
+        if command == EXIT:
+            self.close(sid)
+            return 'OK ' + sid, 'Спасибо за игру. Приходите ещё!\n'
+        events = session.game.events(command)
+        if events and type(events[-1]) is fool.GameOver:  # Партия окончена.
+            self.close(sid)
+        return 'OK ' + sid, fool.render(events)
+
+
+def frame(header, text):  # Ответ в протоколе: заголовок, строки текста, точка.
+    lines = [header]
+    for line in text.splitlines():
+        lines.append('.' + line if line.startswith('.') else line)
+    lines.append('.\n')
+    return '\n'.join(lines).encode('utf-8')
+
+
+async def handle(pool, reader, writer):  # Одно соединение: запросы выполняются по очереди.
+    try:
+        while True:
+            data = await reader.readline()
+            if not data:
+                break
+            line = data.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            writer.write(frame(*pool.execute(line)))
+            await writer.drain()  # Медленный клиент не даёт читать его следующие запросы.
+    except (ValueError, asyncio.LimitOverrunError):  # Строка длиннее лимита потока (64 КБ): соединение закрывается.
+        try:
+            writer.write(frame('ERR Слишком длинная строка', ''))
+            await writer.drain()
+        except ConnectionError:
+            pass
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def serve(host='127.0.0.1', port=8888, max_sessions=10000, idle_timeout=600.0, max_connections=1000,
+                snapshot_path=None, snapshot_interval=60.0):
+    # snapshot_path - файл снимков: партии восстанавливаются при запуске и сохраняются раз в snapshot_interval
+    # секунд и при остановке сервера.
+    pool = SessionPool(max_sessions, idle_timeout)
+    if snapshot_path is not None:
+        pool.restore(snapshot_path)
+        fool_persist.compact(snapshot_path)  # Файл мог остаться от append(): оставить последний снимок.
+    connections = asyncio.Semaphore(max_connections)  # Лишние соединения ждут, пока освободится место.
+
+    async def connection(reader, writer):
+        async with connections:
+            await handle(pool, reader, writer)
+
+    server = await asyncio.start_server(connection, host, port)
+    tasks = [asyncio.ensure_future(pool.evict_forever(min(30.0, idle_timeout)))]
+    if snapshot_path is not None:
+        tasks.append(asyncio.ensure_future(pool.snapshot_forever(snapshot_path, snapshot_interval)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if snapshot_path is not None:
+            if pool.writing is not None:  # Последний снимок пишет тот же временный файл: сначала дождаться потока.
+                await asyncio.wait([pool.writing])
+            pool.snapshot(snapshot_path)
+
+
+if __name__ == '__main__':
+    asyncio.run(serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8888,
+                      snapshot_path=sys.argv[2] if len(sys.argv) > 2 else None))
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Точное решение эндшпиля: колода пуста, обе руки известны (то, что показывает команда cheat).
+# Перебор альфа-бета по правилам Game.next_go с таблицей транспозиций на ключах Зобриста.
+import sys
+from random import Random
+
+import fool_engine
+from card_game_fool import Card, Game, Suit, SUIT_MASKS
+
+WIN, DRAW, LOSS = 1, 0, -1  # Оценки с точки зрения игрока 0 (игрок в Game).
+EXACT, LOWER, UPPER = 0, 1, 2  # Точная оценка, оценка снизу, оценка сверху.
+PASS = -1  # Ход не картой: Пас при атаке, Взял при защите.
+NO_MOVE = -2
+
+# Ключи Зобриста: по случайному 64-битному числу на карту в руке 0, в руке 1 и на столе.
+# Для скорости ключи свёрнуты по байтам маски: _BYTES[где][номер байта][значение байта].
+_random = Random(20200108)
+_KEYS = [[_random.getrandbits(64) for _ in range(Card.len())] for _ in range(3)]
+_BYTES = [[[0] * 256 for _ in range(5)] for _ in range(3)]
+for _where in range(3):
+    for _byte in range(5):
+        for _value in range(256):
+            for _bit in range(8):
+                if _value >> _bit & 1 and _byte * 8 + _bit < Card.len():
+                    _BYTES[_where][_byte][_value] ^= _KEYS[_where][_byte * 8 + _bit]
+_LAST = [_random.getrandbits(64) for _ in range(Card.len() + 1)]  # Последняя карта на столе (или нет карт).
+_MOVER = _random.getrandbits(64)  # Ходит игрок 1.
+_TRUMP = [_random.getrandbits(64) for _ in range(Suit.len())]  # Козырная масть: один Solver решает разные партии.
+
+
+def zobrist(engine):  # Ключ позиции: козырь, руки, стол, последняя карта и чей ход.
+    # Последняя карта важна только при защите: при атаке подкидывают по достоинствам всего стола.
+    key = (_LAST[engine.last + 1] if engine.count & 1 else _LAST[0]) ^ (_MOVER if engine.mover else 0)
+    key ^= _TRUMP[engine.trump]
+    for where, mask in enumerate((engine.hands[0], engine.hands[1], engine.table)):
+        table = _BYTES[where]
+        key ^= (table[0][mask & 255] ^ table[1][mask >> 8 & 255] ^ table[2][mask >> 16 & 255]
+                ^ table[3][mask >> 24 & 255] ^ table[4][mask >> 32])
+    return key
+
+
+#############################################################
+class TranspositionTable:  # Таблица транспозиций ограниченного размера.
+    # В каждой ячейке две записи: "глубокая" вытесняется только записью не меньшей глубины,
+    # "последняя" заменяется всегда. Вытесненная глубокая запись переходит в последние.
+
+    def __init__(self, size=1 << 16):
+        assert isinstance(size, int) and size > 0 and size & (size - 1) == 0  # Степень двойки.
+        self.mask = size - 1
+        self.deep = [None] * size
+        self.recent = [None] * size
+
+    def get(self, key):  # Запись (ключ, глубина, оценка, тип оценки, лучший ход) или None.
+        index = key & self.mask
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.recent[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def put(self, key, depth, value, flag, move):
+        index = key & self.mask
+        entry = key, depth, value, flag, move
+        deep = self.deep[index]
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                self.recent[index] = deep
+            self.deep[index] = entry
+        else:
+            self.recent[index] = entry
+
+    def clear(self):
+        self.deep = [None] * len(self.deep)
+        self.recent = [None] * len(self.recent)
+
+
+##################
+class Solver:  # Решатель позиций с пустой колодой.
+
+    def __init__(self, size=1 << 16, leaf=None):
+        self.table = TranspositionTable(size)
+        self.leaf = leaf  # leaf(engine) -> готовая оценка для игрока 0 или None (например, из fool_tablebase).
+        self.nodes = 0  # Число просмотренных позиций.
+
+    @staticmethod
+    def moves(engine, first=NO_MOVE):  # Ходы по порядку: ход из таблицы, не козыри, козыри, Пас/Взял.
+        legal = engine.legal()
+        trumps = SUIT_MASKS[engine.trump]
+        moves = [first] if first != NO_MOVE else []
+        for mask in legal & ~trumps, legal & trumps:
+            while mask:
+                low = mask & -mask
+                card = low.bit_length() - 1
+                if card != first:
+                    moves.append(card)
+                mask ^= low
+        if first != PASS and (engine.count or not legal):  # Первым ходом пасовать нельзя.
+            moves.append(PASS)
+        return moves
+
+    def search(self, engine, alpha=LOSS, beta=WIN):  # Оценка позиции для игрока 0.
+        if engine.over:
+            return DRAW if engine.winner is None else (WIN if engine.winner == 0 else LOSS)
+        if self.leaf is not None:
+            value = self.leaf(engine)
+            if value is not None:
+                return value
+        self.nodes += 1
+
+        key = zobrist(engine)
+        entry = self.table.get(key)
+        first = NO_MOVE
+        if entry is not None:
+            value, flag, first = entry[2], entry[3], entry[4]
+            if flag == EXACT:
+                return value
+            if flag == LOWER and value > alpha:
+                alpha = value
+            elif flag == UPPER and value < beta:
+                beta = value
+            if alpha >= beta:
+                return value
+
+        maximize = engine.mover == 0  # Игрок 0 повышает оценку, игрок 1 понижает.
+        start_alpha, start_beta = alpha, beta
+        best, best_move = (LOSS - 1, NO_MOVE) if maximize else (WIN + 1, NO_MOVE)
+        for move in self.moves(engine, first):
+            engine.make(None if move == PASS else move)
+            value = self.search(engine, alpha, beta)
+            engine.unmake()
+            if maximize:
+                if value > best:
+                    best, best_move = value, move
+                    alpha = max(alpha, value)
+            elif value < best:
+                best, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        flag = UPPER if best <= start_alpha else LOWER if best >= start_beta else EXACT
+        depth = engine.sizes[0] + engine.sizes[1] + engine.count  # Чем больше карт, тем дороже перебор.
+        self.table.put(key, depth, best, flag, best_move)
+        return best
+
+    def best_move(self, engine):  # Лучший ход mover: (карта или None, оценка для игрока 0).
+        assert engine.cursor == 0 and not engine.over
+        sign = 1 if engine.mover == 0 else -1
+        best, best_move = None, None
+        for move in self.moves(engine):
+            engine.make(None if move == PASS else move)
+            value = self.search(engine)
+            engine.unmake()
+            if best is None or value * sign > best * sign:
+                best, best_move = value, move
+            if best * sign == WIN:
+                break
+        return (None if best_move == PASS else best_move), best
+
+
+def hint(game, solver=None):  # Подсказка игроку в Game при пустой колоде: карта, 'Пас'/'Взял' или None.
+    assert isinstance(game, Game)
+    if game.deck.len():
+        return None
+    move, _ = (solver or Solver()).best_move(fool_engine.Engine.from_game(game))
+    if move is not None:
+        return Card.by_id(move)
+    return 'Пас' if game.table.is_attack() else 'Взял'
+
+
+def position(trump, hand0, hand1):  # Начало кона с пустой колодой: ходит игрок 0.
+    return fool_engine.Engine.from_state(fool_engine.GameState(
+        (), trump, hand0, hand1, bin(hand0).count('1'), bin(hand1).count('1'), 0, 0, -1, 0, 0, 0, 0, 0, 0,
+        False, None))
+
+
+def minimax(engine):  # Оценка полным перебором без таблицы: эталон для check(). Перебор ходов прекращается,
+    # только когда найден выигрыш ходящего: лучше него оценки нет.
+    if engine.over:
+        return DRAW if engine.winner is None else (WIN if engine.winner == 0 else LOSS)
+    sign = 1 if engine.mover == 0 else -1
+    best = None
+    for move in Solver.moves(engine):
+        engine.make(None if move == PASS else move)
+        value = minimax(engine)
+        engine.unmake()
+        if best is None or value * sign > best * sign:
+            best = value
+        if best * sign == WIN:
+            break
+    return best
+
+
+def check(n_positions=200, cards=3, seed=0):  # Один Solver на случайных позициях cards + cards со всеми козырями
+    # по очереди против minimax. Вернёт расхождения: (козырь, рука 0, рука 1, оценка Solver, оценка minimax).
+    rng = Random(seed)
+    solver = Solver()
+    mismatches = []
+    for _ in range(n_positions):
+        dealt = rng.sample(range(Card.len()), 2 * cards)
+        hand0, hand1 = sum(1 << card for card in dealt[:cards]), sum(1 << card for card in dealt[cards:])
+        for trump in range(Suit.len()):
+            value, expected = solver.search(position(trump, hand0, hand1)), minimax(position(trump, hand0, hand1))
+            if value != expected:
+                mismatches.append((trump, hand0, hand1, value, expected))
+    return mismatches
+
+
+if __name__ == '__main__':
+    mismatches = check(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+    print('Расхождений с полным перебором:', len(mismatches))
+    for mismatch in mismatches[:10]:
+        print(mismatch)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# Таблица эндшпиля: точные оценки всех позиций с пустой колодой до K карт на руке у каждого.
+# Позиция в таблице - начало кона: колода и стол пусты, ходит атакующий. Другие начала кона
+# при пустой колоде невозможны (отбой последней картой при пустой колоде заканчивает игру).
+# Масти переименовываются так, чтобы козырь был пиками: правила от названий мастей не зависят.
+# Номер позиции - совершенный хеш: ранг руки атакующего среди всех рук её размера и ранг руки
+# защитника среди рук из оставшихся карт. Оценка занимает 2 бита, файл читается через mmap.
+#   python fool_tablebase.py endgame.tb 2   - построить таблицу до 2 карт на руке.
+import mmap
+import sys
+from itertools import combinations
+from math import comb
+
+import fool_engine
+from card_game_fool import Card, Policy, Dummy, SUIT_MASKS
+from fool_solver import Solver
+
+MAGIC = b'FOOLTB1\n'
+UNKNOWN = 0  # Код "не решено". Остальные коды: оценка для атакующего + 2.
+
+
+def offsets(k):  # Начало блока позиций с руками i и j карт и общее число позиций.
+    result, total = {}, 0
+    for i in range(1, k + 1):
+        for j in range(1, k + 1):
+            result[i, j] = total
+            total += comb(Card.len(), i) * comb(Card.len() - i, j)
+    return result, total
+
+
+def rank(mask):  # Номер набора карт среди всех наборов того же размера (колексикографический).
+    result, n = 0, 0
+    while mask:
+        low = mask & -mask
+        n += 1
+        result += comb(low.bit_length() - 1, n)
+        mask ^= low
+    return result
+
+
+def squeeze(mask, removed):  # Набор mask в нумерации карт, оставшихся после удаления removed.
+    result = 0
+    while mask:
+        low = mask & -mask
+        result |= 1 << (low.bit_length() - 1 - bin(removed & (low - 1)).count('1'))
+        mask ^= low
+    return result
+
+
+def canonical(trump, mask):  # Тот же набор, если переименовать масть trump в пики (и наоборот).
+    if trump == 0:
+        return mask
+    return (mask & ~(SUIT_MASKS[0] | SUIT_MASKS[trump]) | (mask & SUIT_MASKS[0]) << trump
+            | (mask & SUIT_MASKS[trump]) >> trump)
+
+
+def position(attacker, defender):  # Начало кона с пустой колодой: козырь - пики, ходит игрок 0.
+    return fool_engine.Engine.from_state(fool_engine.GameState(
+        (), 0, attacker, defender, bin(attacker).count('1'), bin(defender).count('1'), 0, 0, -1, 0, 0, 0, 0, 0, 0,
+        False, None))
+
+
+class Index:  # Номера позиций в таблице до k карт на руке.
+
+    def __init__(self, k):
+        self.k = k
+        self.offsets, self.total = offsets(k)
+
+    def __call__(self, trump, attacker, defender):  # Номер позиции или None, если её нет в таблице.
+        i, j = bin(attacker).count('1'), bin(defender).count('1')
+        if not (1 <= i <= self.k and 1 <= j <= self.k):
+            return None
+        attacker, defender = canonical(trump, attacker), canonical(trump, defender)
+        return self.offsets[i, j] + rank(attacker) * comb(Card.len() - i, j) + rank(squeeze(defender, attacker))
+
+
+def read(data, start, index):  # Код позиции index из упакованных по 4 на байт оценок.
+    return data[start + (index >> 2)] >> ((index & 3) << 1) & 3
+
+
+def probe(data, start, index_of, engine):  # Оценка для игрока 0 или None, если позиции нет в таблице.
+    if engine.cursor or engine.count or engine.over:
+        return None
+    mover = engine.mover
+    index = index_of(engine.trump, engine.hands[mover], engine.hands[1 - mover])
+    if index is None:
+        return None
+    code = read(data, start, index)
+    if code == UNKNOWN:
+        return None
+    value = code - 2
+    return value if mover == 0 else -value
+
+
+def generate(path, k=2, progress=None):  # Построить таблицу до k карт на руке и записать её в path.
+    assert isinstance(k, int) and 1 <= k <= 6
+    index_of = Index(k)
+    data = bytearray((index_of.total + 3) // 4)
+    solver = Solver(1 << 18, leaf=lambda engine: probe(data, 0, index_of, engine))
+    cards = range(Card.len())
+    # Пас уменьшает число карт, Взял при том же числе карт уменьшает руку атакующего.
+    # Поэтому при таком порядке все начала следующих конов в пределах таблицы уже решены.
+    for total in range(2, 2 * k + 1):
+        for i in range(max(1, total - k), min(k, total - 1) + 1):
+            j = total - i
+            for attack in combinations(cards, i):
+                attacker = sum(1 << card for card in attack)
+                rest = [card for card in cards if not attacker >> card & 1]
+                for defence in combinations(rest, j):
+                    defender = sum(1 << card for card in defence)
+                    value = solver.search(position(attacker, defender))
+                    index = index_of(0, attacker, defender)
+                    data[index >> 2] |= (value + 2) << ((index & 3) << 1)
+            if progress is not None:
+                progress(i, j)
+    with open(path, 'wb') as file:
+        file.write(MAGIC + bytes((k,)) + data)
+
+
+##################
+class Tablebase:  # Таблица эндшпиля из файла. Поиск - несколько операций и одно чтение из mmap.
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert self.data[:len(MAGIC)] == MAGIC, 'Это не таблица эндшпиля'
+        self.k = self.data[len(MAGIC)]
+        self.start = len(MAGIC) + 1
+        self.index = Index(self.k)
+        self.solver = Solver(1 << 14, leaf=self.leaf)
+
+    def close(self):
+        self.data.close()
+
+    def leaf(self, engine):  # Оценка для игрока 0 или None, если позиции нет в таблице.
+        return probe(self.data, self.start, self.index, engine)
+
+    def value(self, engine):  # Оценка для mover: WIN, DRAW, LOSS или None.
+        value = self.leaf(engine)
+        return value if value is None or engine.mover == 0 else -value
+
+    def covers(self, engine):  # Сможет ли поиск до начала следующего кона опереться на таблицу.
+        # После Взял защитник получает весь стол, поэтому считаем его карты вместе со столом.
+        return engine.cursor == 0 and max(engine.sizes) + engine.count <= self.k
+
+    def best_move(self, engine):  # (карта или None, оценка для игрока 0) - поиск до начал конов из таблицы.
+        assert self.covers(engine)
+        return self.solver.best_move(engine)
+
+
+#######################
+class Endgame(Policy):  # Болван, играющий эндшпиль по таблице. В остальное время - fallback.
+
+    def __init__(self, tablebase, fallback=None):
+        assert isinstance(tablebase, Tablebase)
+        self.tablebase = tablebase
+        self.fallback = fallback or Dummy()
+
+    def choose(self, game):
+        engine = fool_engine.Engine.from_game(game, mover=1)
+        if not self.tablebase.covers(engine):
+            return self.fallback.choose(game)
+        move, _ = self.tablebase.best_move(engine)
+        return None if move is None else Card.by_id(move)
+
+    def observe(self, game, gamer, card):
+        self.fallback.observe(game, gamer, card)
+
+
+if __name__ == '__main__':
+    generate(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 2,
+             progress=lambda i, j: print('Решены позиции {} на {} карт'.format(i, j), flush=True))
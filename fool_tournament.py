@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Турнир политик fool_engine по круговой системе с рейтингом Эло.
+# Каждая пара играет зеркальные раздачи: партия номер n дважды, во второй раз игроки меняются местами.
+# Удача раздачи при этом почти сокращается, и разница в силе видна по гораздо меньшему числу партий.
+# Раунды идут пачками на пуле процессов; после каждой пачки пары, чей доверительный интервал разницы рейтингов
+# уже уже precision (или не содержит ноль - кто сильнее, ясно), больше не играют.
+# Рейтинги считаются по суммам очков пар (модель Брэдли-Терри), а не по очереди партий:
+# итог не зависит от числа процессов и порядка, в котором пришли пачки.
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import fool_engine
+from card_game_fool import SUIT_MASKS
+
+BASE = 1500.0  # Средний рейтинг.
+Z = 1.96  # Доверительный интервал 95%.
+
+
+def highest(engine, legal):  # Старшая годная карта, козыри в последнюю очередь. Для сравнения с dummy.
+    moves = legal & ~SUIT_MASKS[engine.trump] or legal
+    return moves.bit_length() - 1 if moves else None
+
+
+def mirrored(seed, policy_a, policy_b):  # Очки policy_a за зеркальную раздачу: 0, 0.5 или 1 (средняя двух партий).
+    score = 0.0
+    for winner, a in (fool_engine.play(seed, policy_a, policy_b).winner, 0), \
+                     (fool_engine.play(seed, policy_b, policy_a).winner, 1):
+        score += 0.5 if winner is None else (winner == a)
+    return score / 2
+
+
+def match(start, count, policy_a, policy_b):  # Раздачи start .. start + count - 1: (число, сумма, сумма квадратов).
+    total = squares = 0.0
+    for seed in range(start, start + count):
+        score = mirrored(seed, policy_a, policy_b)
+        total += score
+        squares += score * score
+    return count, total, squares
+
+
+def elo(score):  # Разница рейтингов при доле очков score.
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return 400 * math.log10(score / (1 - score))
+
+
+#####################
+class Ratings:  # Таблица турнира: очки каждой пары и рейтинги по ним.
+
+    def __init__(self, names):
+        assert len(names) >= 2 and len(set(names)) == len(names)
+        self.names = list(names)
+        self.pairs = {pair: [0, 0.0, 0.0] for pair in combinations(self.names, 2)}  # Раздачи, очки, их квадраты.
+
+    def add(self, a, b, count, total, squares):  # Итог пачки зеркальных раздач a против b (очки a).
+        pair = self.pairs[a, b]
+        pair[0] += count
+        pair[1] += total
+        pair[2] += squares
+
+    def games(self, name=None):  # Число сыгранных партий всего или игроком name.
+        return sum(2 * pair[0] for (a, b), pair in self.pairs.items() if name is None or name in (a, b))
+
+    def score(self, a, b):  # Доля очков a против b.
+        count, total, _ = self.pairs[a, b]
+        return total / count if count else 0.5
+
+    def interval(self, a, b, z=Z):  # Разница рейтингов a и b и половина её доверительного интервала.
+        count, total, squares = self.pairs[a, b]
+        if count < 2:
+            return 0.0, float('inf')
+        mean = total / count
+        error = math.sqrt(max(squares / count - mean * mean, 0.0) / (count - 1))
+        p = min(max(mean, 0.01), 0.99)  # Производная elo() у краёв бесконечна.
+        return elo(mean), z * error * 400 / (math.log(10) * p * (1 - p))
+
+    def settled(self, a, b, precision, z=Z):  # Интервал уже уже precision или не содержит ноль.
+        difference, half = self.interval(a, b, z)
+        return half <= precision / 2 or abs(difference) > half
+
+    def ratings(self, iterations=200):  # {имя: рейтинг}, в среднем BASE.
+        # Сила по методу MM для модели Брэдли-Терри. В каждую пару добавлена одна ничья: без неё у игрока
+        # без очков сила 0 и рейтинг минус бесконечность.
+        strength = dict.fromkeys(self.names, 1.0)
+        points = dict.fromkeys(self.names, 0.0)
+        for (a, b), (count, total, _) in self.pairs.items():
+            points[a] += total + 0.5
+            points[b] += count - total + 0.5
+        for _ in range(iterations):
+            weights = dict.fromkeys(self.names, 0.0)
+            for (a, b), (count, _, _) in self.pairs.items():
+                weight = (count + 1) / (strength[a] + strength[b])
+                weights[a] += weight
+                weights[b] += weight
+            strength = {name: points[name] / weights[name] for name in self.names}
+        logs = {name: 400 * math.log10(value) for name, value in strength.items()}
+        shift = BASE - sum(logs.values()) / len(logs)
+        return {name: value + shift for name, value in logs.items()}
+
+    def __repr__(self):
+        ratings = self.ratings()
+        lines = ['{:<16}{:>8}{:>10}'.format('Игрок', 'Эло', 'Партий')]
+        for name in sorted(self.names, key=ratings.get, reverse=True):
+            lines.append('{:<16}{:>8.0f}{:>10}'.format(name, ratings[name], self.games(name)))
+        return '\n'.join(lines)
+
+
+def run(players, rounds=100000, seed=0, batch=1000, workers=None, precision=20.0, z=Z, min_rounds=200):
+    # players - {имя: политика}. Политики должны быть функциями уровня модуля (pickle), если workers != 1.
+    # Каждая пара играет раздачи seed, seed + 1, ..., пока её интервал не сойдётся или раздачи не кончатся.
+    assert isinstance(rounds, int) and rounds > 0
+    assert isinstance(batch, int) and batch > 0
+    workers = workers or os.cpu_count() or 1
+    table = Ratings(list(players))
+    active = list(table.pairs)
+    start = seed
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while active and start < seed + rounds:
+            count = min(batch, seed + rounds - start)
+            chunk = -(-count * len(active) // workers)  # Раздач на задачу: чтобы задач было не меньше процессов.
+            jobs = [(a, b, first, min(chunk, start + count - first))
+                    for a, b in active for first in range(start, start + count, chunk)]
+            if executor is None:
+                results = [match(first, size, players[a], players[b]) for a, b, first, size in jobs]
+            else:
+                results = [future.result() for future in
+                           [executor.submit(match, first, size, players[a], players[b]) for a, b, first, size in jobs]]
+            for (a, b, _, _), result in zip(jobs, results):
+                table.add(a, b, *result)
+            start += count
+            if start - seed >= min_rounds:
+                active = [pair for pair in active if not table.settled(*pair, precision=precision, z=z)]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return table
+
+
+if __name__ == '__main__':
+    print(run({'dummy': fool_engine.dummy, 'highest': highest}))
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# Варианты правил: колода 36 или 52 карты, размер руки, переводной дурак, от 2 до 6 игроков.
+# Rules компилируется в таблицы (compile_rules): маски мастей и достоинств, чем бить каждую карту, порядок добора.
+# Правила кона те же, что в fool_engine.Engine: подкидывает только атакующий, карты бьют по одной по очереди.
+# При Rules() партия VariantEngine совпадает с fool_engine.Engine ход в ход.
+# Игроки с пустыми руками выходят из игры, только когда колода пуста; дурак - последний, у кого остались карты.
+from collections import namedtuple
+from functools import lru_cache
+from random import Random
+
+from card_game_fool import Suit, Dignity
+
+# deck - 36 или 52 карты; hand - до скольких карт добирают руку; transfer - переводной; players - от 2 до 6.
+Rules = namedtuple('Rules', 'deck hand transfer players', defaults=(36, 6, False, 2))
+
+# fool: номер проигравшего игрока, None - ничья (у всех кончились карты одновременно) или партия не окончена.
+# turns: число ходов. taken: сколько карт каждый игрок взял со стола.
+# capped: партию остановил предел ходов play() - это не ничья, fool при этом None.
+Result = namedtuple('Result', 'fool turns taken capped')
+
+TRANSFER = 64  # move(TRANSFER | карта) - перевод этой картой.
+LOW_DIGNITIES = '2', '3', '4', '5'  # Младшие достоинства колоды в 52 карты.
+MAX_TURNS = 2000  # Предел длины партии в play().
+
+# Скомпилированные правила. Номер карты - достоинство * 4 + масть, как в card_game_fool.
+# suits[масть], dignities[номер карты] - маска карт того же достоинства, cover[козырь][номер карты] - чем бить,
+# rotation[игрок] - все места по кругу, начиная с него (порядок добора).
+Tables = namedtuple('Tables', 'rules cards suits dignities cover rotation names')
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules):  # Таблицы для правил rules. Одни и те же правила компилируются один раз.
+    assert isinstance(rules, Rules)
+    assert rules.deck in (36, 52), 'Колода - 36 или 52 карты'
+    assert 2 <= rules.players <= 6
+    assert 0 < rules.hand and rules.hand * rules.players <= rules.deck
+    suits = Suit.len()
+    names = [str(dignity) for dignity in Dignity.sequence()]
+    if rules.deck == 52:
+        names = list(LOW_DIGNITIES) + names
+    cards = len(names) * suits
+    suit_masks = tuple(sum(1 << card for card in range(suit, cards, suits)) for suit in range(suits))
+    dignities = tuple(((1 << suits) - 1) << (card - card % suits) for card in range(cards))
+    older = tuple(sum(1 << other for other in range(card + suits, cards, suits)) for card in range(cards))  # Та же масть.
+    cover = tuple(tuple(older[card] | (suit_masks[trump] if card % suits != trump else 0) for card in range(cards))
+                  for trump in range(suits))
+    rotation = tuple(tuple((first + n) % rules.players for n in range(rules.players)) for first in range(rules.players))
+    return Tables(rules, cards, suit_masks, dignities, cover, rotation,
+                  tuple('{}-{}'.format(names[card // suits], Suit(card % suits)) for card in range(cards)))
+
+
+def deal_order(seed, rules=Rules()):  # Порядок колоды для номера партии: для 36 карт - как fool_engine.deal_order.
+    order = list(range(compile_rules(rules).cards))
+    Random(seed).shuffle(order)
+    return order
+
+
+####################################################
+class VariantEngine:  # Состояние партии по правилам rules целыми числами.
+
+    __slots__ = ('tables', 'hand_size', 'transfer', 'order', 'cursor', 'trump', 'trumps', 'cover', 'same',
+                 'hands', 'sizes', 'table', 'dignities', 'last', 'waiting', 'count', 'covered', 'attacker', 'defender',
+                 'mover', 'out', 'next', 'turns', 'taken', 'over', 'fool')
+
+    def __init__(self, order, rules=Rules()):
+        self.tables = compile_rules(rules)
+        assert len(order) == self.tables.cards
+        players = rules.players
+        self.hand_size = rules.hand
+        self.transfer = rules.transfer
+        self.order = order  # Колода: order[0] - козырная карта, берут с конца.
+        self.cursor = len(order)  # Сколько карт осталось в колоде.
+        self.trump = order[0] & 3  # Козырная масть.
+        self.trumps = self.tables.suits[self.trump]  # Все козыри.
+        self.cover = self.tables.cover[self.trump]  # Чем бить каждую карту при этом козыре.
+        self.same = self.tables.dignities  # Карты того же достоинства.
+        self.hands = [0] * players  # Руки игроков битовыми масками.
+        self.sizes = [0] * players  # Число карт в руках.
+        self.table = 0  # Карты на столе.
+        self.dignities = 0  # Все карты достоинств, лежащих на столе.
+        self.last = -1  # Карта, которую нужно побить, или -1 при атаке.
+        self.waiting = 0  # Другие непобитые карты (после переводов): их бьют потом, младшую первой.
+        self.count = 0  # Число карт на столе.
+        self.covered = False  # Бита ли в этом коне хоть одна карта (после этого переводить нельзя).
+        self.attacker = 0  # Первым ходит игрок 0.
+        self.defender = 1
+        self.mover = 0  # Чей ход.
+        self.out = [False] * players  # Вышел из игры.
+        self.next = [rotation[1] for rotation in self.tables.rotation]  # Следующий по кругу игрок, который ещё в игре.
+        self.turns = 0
+        self.taken = [0] * players
+        self.over = False
+        self.fool = None
+        self.deal(0)
+
+    def deal(self, first):  # Раздача до hand_size карт по одной по кругу, начиная с first.
+        order, hands, sizes, size = self.order, self.hands, self.sizes, self.hand_size
+        seats = self.tables.rotation[first]
+        while self.cursor:
+            dealt = False
+            for player in seats:
+                if self.cursor and sizes[player] < size:
+                    self.cursor -= 1
+                    hands[player] |= 1 << order[self.cursor]
+                    sizes[player] += 1
+                    dealt = True
+            if not dealt:  # Если карты уже не берут.
+                break
+
+    def leave(self, player):  # player вышел из игры: его место пропускается.
+        self.out[player] = True
+        for seat, rotation in enumerate(self.tables.rotation):
+            self.next[seat] = next((other for other in rotation[1:] if not self.out[other]), seat)
+
+    def legal(self):  # Маска карт, которыми может ходить mover (без переводов, см. transfers()).
+        hand = self.hands[self.mover]
+        if self.last >= 0:  # Защита.
+            return hand & self.cover[self.last]
+        if self.count == 0:  # Первый ход любая карта.
+            return hand
+        return hand & self.dignities  # Подкидывать только уже присутствующего достоинства.
+
+    def transfers(self):  # Маска карт, которыми защитник может перевести кон на следующего игрока.
+        if not self.transfer or self.last < 0 or self.covered:
+            return 0
+        if self.sizes[self.next[self.defender]] <= 1 + bin(self.waiting).count('1'):  # Следующему нечем отбиться.
+            return 0
+        return self.hands[self.mover] & self.same[self.last]
+
+    def clear(self):  # Очистить стол.
+        self.table = 0
+        self.dignities = 0
+        self.count = 0
+        self.covered = False
+
+    def move(self, card):  # Ход mover: номер карты, TRANSFER | карта или None (Пас при атаке, Взял при защите).
+        mover = self.mover
+        attack = self.last < 0  # Атакует ли mover.
+        self.turns += 1
+        ticket = False  # Право внеочередного хода.
+
+        if card is not None:  # Ход картой.
+            transfer = card >= TRANSFER
+            if transfer:
+                card ^= TRANSFER
+            bit = 1 << card
+            assert (self.transfers() if transfer else self.legal()) & bit
+            self.hands[mover] ^= bit
+            self.sizes[mover] -= 1
+            self.table |= bit
+            self.dignities |= self.same[card]
+            self.count += 1
+            if attack:
+                self.last = card
+                self.mover = self.defender
+                return
+            if transfer:  # Защитник становится атакующим, кон переходит к следующему.
+                self.waiting |= bit
+                self.attacker = mover
+                self.defender = self.mover = self.next[mover]
+                return
+            self.covered = True
+            if self.waiting:  # Бить следующую непобитую карту.
+                self.last = (self.waiting & -self.waiting).bit_length() - 1
+                self.waiting ^= 1 << self.last
+                return
+            self.last = -1
+            if self.sizes[self.attacker] and self.sizes[mover]:  # Кон продолжается.
+                self.mover = self.attacker
+                return
+            ticket = True  # Отбился, и у кого-то кончились карты. Теперь ходит первым.
+        elif attack:  # Пас.
+            assert self.count > 0 or self.legal() == 0  # Первым ходом пасовать нельзя.
+            self.clear()
+        else:  # Взял. Все карты со стола ему в руку.
+            self.hands[mover] |= self.table
+            self.sizes[mover] += self.count
+            self.taken[mover] += self.count
+            self.last = -1
+            self.waiting = 0
+            self.clear()
+
+        if self.cursor == 0:  # Колода пуста.
+            if not attack and 0 in self.sizes:  # У кого-то кончились карты (или он уже вышел).
+                for player, size in enumerate(self.sizes):
+                    if not size and not self.out[player]:
+                        self.leave(player)
+                playing = [player for player, out in enumerate(self.out) if not out]
+                if len(playing) <= 1:  # Карты остались у одного или ни у кого.
+                    self.over = True
+                    self.fool = playing[0] if playing else None
+                    return
+        else:
+            self.deal(self.attacker if ticket or attack else mover)  # Начинаем с того кто сейчас ходил.
+
+        if card is None and not attack:  # Взял: ходит следующий за ним.
+            self.attacker = self.next[self.defender]
+        else:  # Пас или отбился: ходит защищавшийся.
+            self.attacker = self.defender if not self.out[self.defender] else self.next[self.defender]
+        self.defender = self.next[self.attacker]
+        self.mover = self.attacker
+
+    def result(self):
+        assert self.over
+        return Result(self.fool, self.turns, tuple(self.taken), False)
+
+
+def dummy(engine, legal):  # Младшая годная карта, козыри в последнюю очередь. Переводит, только если нечем бить.
+    suit = engine.trumps
+    if not legal:
+        moves = engine.transfers()
+        moves = moves & ~suit or moves
+        if moves:
+            return TRANSFER | (moves & -moves).bit_length() - 1
+    moves = legal & ~suit or legal
+    return (moves & -moves).bit_length() - 1 if moves else None
+
+
+def play(seed, rules=Rules(), policies=None, max_turns=MAX_TURNS):  # Сыграть партию. policies[игрок](engine, legal).
+    engine = VariantEngine(deal_order(seed, rules), rules)
+    policies = policies or [dummy] * rules.players
+    while not engine.over and engine.turns < max_turns:
+        engine.move(policies[engine.mover](engine, engine.legal()))
+    if engine.over:
+        return engine.result()
+    # Нескольких Болванов можно зациклить: козырь ходит по кругу. Такая партия остановлена, а не сыграна вничью.
+    return Result(None, engine.turns, tuple(engine.taken), True)
+
+
+def simulate(n_games, seed=0, rules=Rules()):  # Число поражений каждого игрока, ничьих и остановленных партий.
+    fools = [0] * (rules.players + 2)  # Предпоследний - ничьи, последний - партии, остановленные пределом ходов.
+    for n in range(seed, seed + n_games):
+        result = play(n, rules)
+        fools[-1 if result.capped else -2 if result.fool is None else result.fool] += 1
+    return fools
+
+
+if __name__ == '__main__':
+    for rules in Rules(), Rules(transfer=True), Rules(deck=52, players=4), Rules(deck=52, players=6, transfer=True):
+        print(rules, simulate(10000, rules=rules))
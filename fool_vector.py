@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# Векторный прогон тысяч партий Болван против Болвана одновременно (нужен NumPy).
+# Каждая партия - строка массивов: руки и стол битовыми масками int64, колода - матрица порядков.
+# Все партии делают по одному ходу за шаг; правила те же, что в Game.next_go и fool_engine.Engine.
+import sys
+from functools import lru_cache
+from random import Random
+
+import numpy as np
+
+import fool_engine
+from card_game_fool import Card, Game, GameOver, SUIT_MASKS, DIGNITY_MASKS, COVER_MASKS
+
+HAND_SIZE = fool_engine.HAND_SIZE
+DRAW = -1  # winner для ничьей.
+
+_SUITS = np.array(SUIT_MASKS, dtype=np.int64)  # Все карты масти.
+_COVER = np.array(COVER_MASKS, dtype=np.int64)  # [козырь, карта] - чем её можно побить.
+_DIGNITY = np.array([DIGNITY_MASKS[card.id() >> 2] for card in Card.sequence()], dtype=np.int64)  # По карте.
+
+
+def lowest_cards(masks):  # Номера младших карт непустых масок.
+    low = masks & -masks
+    return np.frexp(low.astype(np.float64))[1].astype(np.int64) - 1  # Степень двойки точна в float64.
+
+
+#################################################
+class VectorEngine:  # N партий в массивах.
+
+    def __init__(self, orders):  # orders - матрица N x 36, в каждой строке порядок колоды как в Engine.
+        self.orders = np.asarray(orders, dtype=np.int64)
+        assert self.orders.ndim == 2 and self.orders.shape[1] == Card.len()
+        n = len(self.orders)
+        self.games = np.arange(n)
+        self.cursor = np.full(n, Card.len(), dtype=np.int64)
+        self.trump = self.orders[:, 0] & 3
+        self.hands = np.zeros((n, 2), dtype=np.int64)
+        self.sizes = np.zeros((n, 2), dtype=np.int64)
+        self.table = np.zeros(n, dtype=np.int64)
+        self.dignities = np.zeros(n, dtype=np.int64)
+        self.last = np.zeros(n, dtype=np.int64)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.mover = np.zeros(n, dtype=np.int64)
+        self.turns = np.zeros(n, dtype=np.int64)
+        self.taken = np.zeros((n, 2), dtype=np.int64)
+        self.over = np.zeros(n, dtype=bool)
+        self.winner = np.full(n, DRAW, dtype=np.int64)
+        self.deal(self.games, np.zeros(n, dtype=np.int64))
+
+    def deal(self, games, first):  # Раздача до 6 карт по одной, начиная с first, в партиях games.
+        second = 1 - first
+        while len(games):
+            dealt = np.zeros(len(games), dtype=bool)
+            for player in first, second:
+                can = (self.cursor[games] > 0) & (self.sizes[games, player] < HAND_SIZE)
+                g, p = games[can], player[can]
+                self.cursor[g] -= 1
+                self.hands[g, p] |= np.int64(1) << self.orders[g, self.cursor[g]]
+                self.sizes[g, p] += 1
+                dealt |= can
+            games, first, second = games[dealt], first[dealt], second[dealt]  # Кто ещё берёт карты.
+
+    def legal(self, games):  # Маски карт, которыми может ходить mover в партиях games.
+        hand = self.hands[games, self.mover[games]]
+        count = self.count[games]
+        cover = hand & _COVER[self.trump[games], self.last[games]]
+        throw = hand & self.dignities[games]
+        return np.where(count == 0, hand, np.where(count & 1, cover, throw))
+
+    def dummy(self, games):  # Политика Game.dummy: младшая годная карта, козыри в последнюю очередь.
+        legal = self.legal(games)
+        moves = legal & ~_SUITS[self.trump[games]]
+        moves = np.where(moves != 0, moves, legal)
+        return np.where(moves != 0, lowest_cards(moves), -1)  # -1: Пас или Взял.
+
+    def step(self):  # Один ход во всех неоконченных партиях.
+        games = self.games[~self.over]
+        if not len(games):
+            return False
+        card = self.dummy(games)
+        mover = self.mover[games]
+        attack = self.count[games] & 1 == 0  # Атакует ли mover.
+        self.turns[games] += 1
+
+        played = card >= 0  # Ход картой.
+        g, p, c = games[played], mover[played], card[played]
+        bit = np.int64(1) << c
+        self.hands[g, p] ^= bit
+        self.sizes[g, p] -= 1
+        self.table[g] |= bit
+        self.dignities[g] |= _DIGNITY[c]
+        self.last[g] = c
+        self.count[g] += 1
+
+        empty = (self.sizes[games, 0] == 0) | (self.sizes[games, 1] == 0)  # У кого-то кончились карты.
+        ticket = played & ~attack & empty  # Отбился, и у кого-то кончились карты. Теперь ходит первым.
+        take = ~played & ~attack  # Взял. Все карты со стола ему в руку.
+        g, p = games[take], mover[take]
+        self.hands[g, p] |= self.table[g]
+        self.sizes[g, p] += self.count[g]
+        self.taken[g, p] += self.count[g]
+
+        g = games[~played]  # Пас или Взял: очистить стол. После отбоя последней картой стол не чистится.
+        self.table[g] = 0
+        self.dignities[g] = 0
+        self.last[g] = 0
+        self.count[g] = 0
+
+        deck_empty = self.cursor[games] == 0
+        empty = (self.sizes[games, 0] == 0) | (self.sizes[games, 1] == 0)
+        settle = ticket | ~played  # Кон закончен: отбился последней картой, Пас или Взял.
+        the_end = settle & deck_empty & (ticket | take) & empty
+        g = games[the_end]
+        self.over[g] = True
+        s0, s1 = self.sizes[g, 0], self.sizes[g, 1]
+        self.winner[g] = np.where(s0 == s1, DRAW, np.where(s0 == 0, 0, 1))
+
+        deal = settle & ~deck_empty
+        self.deal(games[deal], np.where(ticket, 1 - mover, mover)[deal])  # Начинаем с того кто сейчас ходил.
+
+        self.mover[games] = np.where(ticket, mover, 1 - mover)
+        return True
+
+    def run(self):  # Доиграть все партии.
+        while self.step():
+            pass
+        return self
+
+    def stats(self):  # Сводка в том же виде, что у fool_engine.simulate.
+        stats = fool_engine.Stats()
+        for winner, turns, taken in zip(self.winner.tolist(), self.turns.tolist(), self.taken.tolist()):
+            stats.add(fool_engine.Result(None if winner == DRAW else winner, turns, tuple(taken)))
+        return stats
+
+
+_MT_SIZE = 624  # Слов в состоянии MT19937 (генератор random).
+_MT_OUTPUTS = 96  # Сколько первых чисел генератора считать векторно. На тасовку 36 карт уходит 35-90.
+
+
+def _genrand_init():  # Состояние MT19937 после init_genrand(19650218): с него Random(n) начинает для любого n.
+    mt = [19650218]
+    for i in range(1, _MT_SIZE):
+        mt.append((1812433253 * (mt[-1] ^ mt[-1] >> 30) + i) & 0xFFFFFFFF)
+    return np.array(mt, dtype=np.uint32)
+
+
+_MT_INIT = _genrand_init()
+
+
+def mt_states(seeds):  # Состояния MT19937 генераторов Random(seed) для seed < 2**32: матрица 624 x N (init_by_array).
+    seeds = np.asarray(seeds, dtype=np.uint32)
+    mt = np.repeat(_MT_INIT[:, None], len(seeds), axis=1)
+    x = np.empty_like(seeds)
+    for multiplier, steps, i, key in (1664525, _MT_SIZE, 1, seeds), (1566083941, _MT_SIZE - 1, 2, None):
+        multiplier = np.uint32(multiplier)
+        for _ in range(steps):  # Цепочка по i последовательная, векторно - по партиям.
+            prev = mt[i - 1]
+            np.right_shift(prev, np.uint32(30), out=x)
+            x ^= prev
+            x *= multiplier
+            x ^= mt[i]
+            if key is not None:
+                x += key
+            else:
+                x -= np.uint32(i)
+            mt[i] = x
+            i += 1
+            if i == _MT_SIZE:
+                mt[0] = mt[_MT_SIZE - 1]
+                i = 1
+    mt[0] = 0x80000000
+    return mt
+
+
+def mt_outputs(mt, count=_MT_OUTPUTS):  # Первые count чисел генераторов (getrandbits(32)): матрица count x N.
+    # Первые 227 чисел после перемешивания зависят только от прежнего состояния: считаются сразу.
+    assert count <= _MT_SIZE - 397
+    y = (mt[:count] & np.uint32(0x80000000)) | (mt[1:count + 1] & np.uint32(0x7fffffff))
+    odd = (y & np.uint32(1)) * np.uint32(0x9908b0df)
+    y >>= np.uint32(1)
+    y ^= mt[397:397 + count]
+    y ^= odd
+    y ^= y >> np.uint32(11)
+    y ^= (y << np.uint32(7)) & np.uint32(0x9d2c5680)
+    y ^= (y << np.uint32(15)) & np.uint32(0xefc60000)
+    y ^= y >> np.uint32(18)
+    return y
+
+
+def shuffled(seeds):  # Колоды Random(seed).shuffle(list(range(36))) для seed < 2**32, как fool_engine.deal_order.
+    # Random.shuffle: для i от 35 до 1 карта i меняется с картой _randbelow(i + 1) - старшие биты очередного числа,
+    # пока они не меньше i + 1. Партии, которым не хватило _MT_OUTPUTS чисел, тасуются в Python.
+    outputs = mt_outputs(mt_states(seeds))
+    games = np.arange(len(outputs[0]))
+    orders = np.tile(np.arange(Card.len(), dtype=np.int64), (len(games), 1))
+    used = np.zeros(len(games), dtype=np.int64)
+    for i in range(Card.len() - 1, 0, -1):
+        shift = np.uint32(32 - (i + 1).bit_length())
+        j = (outputs[np.minimum(used, _MT_OUTPUTS - 1), games] >> shift).astype(np.int64)
+        used += 1
+        again = np.flatnonzero(j > i)
+        while len(again):
+            again = again[used[again] < _MT_OUTPUTS]
+            j[again] = outputs[used[again], again] >> shift
+            used[again] += 1
+            again = again[j[again] > i]
+        card = orders[:, i].copy()
+        orders[:, i] = orders[games, j]
+        orders[games, j] = card
+    for n in np.flatnonzero(used >= _MT_OUTPUTS).tolist():  # Редко: числа кончились, j мог остаться неверным.
+        orders[n] = fool_engine.deal_order(int(seeds[n]))
+    return orders
+
+
+@lru_cache(maxsize=None)
+def vector_deals():  # Совпадает ли shuffled() с Random.shuffle этого интерпретатора. Проверяется один раз.
+    # shuffled() повторяет устройство random в CPython (init_by_array, _randbelow), а язык его не обещает.
+    seeds = list(range(64)) + list(range(2 ** 32 - 64, 2 ** 32))
+    return np.array_equal(shuffled(np.array(seeds, dtype=np.int64)), [fool_engine.deal_order(n) for n in seeds])
+
+
+def deal_orders(n_games, seed=0, chunk=16384):  # Колоды партий с номерами seed .. seed + n_games - 1.
+    # Векторно, если vector_deals(), иначе - Random(n).shuffle для каждой партии.
+    if seed < 0 or seed + n_games > 2 ** 32 or not vector_deals():  # Ключ Random из нескольких слов - только в Python.
+        return np.array([fool_engine.deal_order(n) for n in range(seed, seed + n_games)], dtype=np.int64)
+    seeds = np.arange(seed, seed + n_games, dtype=np.int64)
+    return np.concatenate([shuffled(seeds[start:start + chunk]) for start in range(0, n_games, chunk)] or
+                          [np.zeros((0, Card.len()), dtype=np.int64)])
+
+
+def random_orders(n_games, rng):  # Случайные колоды без привязки к номерам партий (для Монте-Карло).
+    assert isinstance(rng, np.random.Generator)
+    return rng.permuted(np.tile(np.arange(Card.len(), dtype=np.int64), (n_games, 1)), axis=1)
+
+
+def simulate(n_games, seed=0):  # То же, что fool_engine.simulate(n_games, seed), но векторно.
+    return VectorEngine(deal_orders(n_games, seed)).run().stats()
+
+
+def reference(seed):  # Та же партия в объектной модели Game: игрок ходит по правилу Болвана.
+    game = Game(Random(seed))
+    winners = {'Gamer': 0, 'Dummy': 1, None: None}
+    while True:
+        legal = game.table.legal_moves(game.hand_gamer.mask)
+        moves = legal & ~SUIT_MASKS[game.table.trump_suit().value()] or legal
+        event = game.play(Card.by_id((moves & -moves).bit_length() - 1) if moves else None)[-1]
+        if type(event) is GameOver:
+            return winners[event.winner], game.hand_gamer.mask, game.hand_dummy.mask
+
+
+def check(n_games=1000, seed=0):  # Проверка эквивалентности с Game и fool_engine. Вернёт номера расхождений.
+    engine = VectorEngine(deal_orders(n_games, seed)).run()
+    mismatches = []
+    for n in range(n_games):
+        winner = None if engine.winner[n] == DRAW else int(engine.winner[n])
+        vector = winner, int(engine.hands[n, 0]), int(engine.hands[n, 1])
+        result = fool_engine.play(seed + n)
+        if vector != reference(seed + n) or (winner, int(engine.turns[n])) != result[:2] \
+                or tuple(engine.taken[n].tolist()) != result.taken:
+            mismatches.append(seed + n)
+    return mismatches
+
+
+if __name__ == '__main__':
+    mismatches = check()
+    print('Расхождений с Game и fool_engine:', len(mismatches))
+    if mismatches:
+        print(mismatches[:10])
+        sys.exit(1)
+    print(simulate(100000))
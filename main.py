@@ -1,42 +1,74 @@
 # -*- coding: utf-8 -*-
+# python main.py                          - игра в консоли;
+# python main.py --batch [файл]           - команды по строке из файла или stdin, ответы без приглашений "> ";
+# python main.py --seed 7 --batch < cmds  - та же раздача при каждом запуске (для сценариев и ботов).
+# Если stdin - не терминал (команды идут через pipe), режим пакетный и без --batch.
+import argparse
+import random
+import sys
+
 import card_game_fool as fool
 
-game=fool.Game()
-print(game.hello())  # Приветствие - отобразит текст "Добро пожаловать в игру".
-print(game.command_commands())  # Список команд.
-print('Козырь: ', end='')
-print(game.command_trump(), end='')  # Козырь - отобразит последнюю карту колоды задающую козырную масть.
-print('Рука: ', end='')
-print(game.command_hand())  # Рука - отобразит ваши карты.
+RESULTS = {  # GameOver.winner -> текст.
+    None: 'Ничья. Не плохо сыграно!',
+    'Gamer': 'Поздравляю! Вы выиграли.',
+    'Dummy': 'Вы выиграли проиграли. Вы дурак!',
+}
+
+
+def start(game):  # Начало партии: приветствие, команды, козырь и рука.
+    string = game.hello() + '\n'  # Приветствие - отобразит текст "Добро пожаловать в игру".
+    string += game.command_commands() + '\n'  # Список команд.
+    string += 'Козырь: ' + game.command_trump()  # Козырь - отобразит последнюю карту колоды задающую козырную масть.
+    string += 'Рука: ' + game.command_hand() + '\n'  # Рука - отобразит ваши карты.
+    return string
 
-while True:  # Основной цикл.
-    cmd = input('> ')
 
-    if cmd == 'Выход':
-        break
+def answer(game, cmd):  # Ответ на команду и окончена ли игра.
+    events = game.events(cmd)
+    if events and type(events[-1]) is fool.GameOver:  # Если игра окончена.
+        return fool.render(events[:-1]) + '\n' + RESULTS[events[-1].winner] + '\n', True
+    return fool.render(events) + '\n', False
 
-    if cmd == '':
-        continue
 
-    string = game.command(cmd)
-    split = string.find('GameOver:')
+def play(game, commands, write):  # Основной цикл: команды по одной, ответы через write.
+    write(start(game))
+    for cmd in commands:
+        if cmd == 'Выход':
+            break
+        if cmd == '':
+            continue
+        string, over = answer(game, cmd)
+        write(string)
+        if over:
+            break
+    write('Спасибо за игру. Приходите ещё!\n\n')
 
-    if split != -1:  # Если игра окончена.
 
-        print(string[:split])
-        result = string[split:]
+def parse(argv):  # Аргументы командной строки. Ошибка в них - подсказка и выход с кодом 2 (argparse).
+    parser = argparse.ArgumentParser(prog='main.py', description='Игра в дурака с Болваном.')
+    parser.add_argument('--batch', action='store_true', help='команды по строке, ответы без приглашений "> "')
+    parser.add_argument('--seed', type=int, help='номер раздачи: та же раздача при каждом запуске')
+    parser.add_argument('script', nargs='?', help='файл команд (по умолчанию stdin), включает --batch')
+    return parser.parse_args(argv)
 
-        if result == 'GameOver:None':
-            print('Ничья. Не плохо сыграно!')
 
-        if result == 'GameOver:Gamer':
-            print('Поздравляю! Вы выиграли.')
+def main(argv):
+    args = parse(argv)
+    batch = args.batch or args.script is not None or not sys.stdin.isatty()
+    game = fool.Game(random.Random(args.seed) if args.seed is not None else None)
 
-        if result == 'GameOver:Dummy':
-            print('Вы выиграли проиграли. Вы дурак!')
+    if not batch:
+        play(game, iter(lambda: input('> '), None), lambda string: print(string, end=''))
+        return 0
 
-        break
+    output = []  # Ответы копятся и пишутся разом при выходе: без сброса буфера на каждой строке.
+    stream = open(args.script, encoding='utf-8') if args.script else sys.stdin
+    with stream:
+        play(game, (line.rstrip('\r\n') for line in stream), output.append)
+    sys.stdout.write(''.join(output))
+    return 0
 
-    print(string)
 
-print('Спасибо за игру. Приходите ещё!\n')
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))